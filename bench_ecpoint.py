@@ -0,0 +1,38 @@
+# --- Benchmark of the multi-scalar multiplication ---
+if __name__ == "__main__":
+
+    from random import randrange
+    from timeit import timeit
+    from btc.ecpoint import ECPoint
+
+    order = ECPoint.get_secp256k1_order()
+    g = ECPoint.get_secp256k1_generator()
+
+    def naive_sum(terms):
+        """Return the sum of separate scalar multiplications"""
+        s = ECPoint.infinity()
+        for p, k in terms:
+            s = s + p * k
+        return s
+
+    # Compare the naive sum, interleaved wNAF (Strauss) and
+    # the bucket method (Pippenger) for the growing number of terms
+    print("{:>6s} {:>12s} {:>12s} {:>12s}".format(
+        "terms", "naive, ms", "strauss, ms", "pippenger, ms"))
+    for count in [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]:
+        terms = [(g * randrange(1, order), randrange(1, order))
+                 for _ in range(count)]
+        number = max(1, 64 // count)
+
+        assert naive_sum(terms) == \
+               ECPoint.multi_multiply(terms, method="strauss") == \
+               ECPoint.multi_multiply(terms, method="pippenger")
+
+        print("{:6d} {:12.2f} {:12.2f} {:12.2f}".format(
+            count,
+            timeit(lambda: naive_sum(terms), number=number) / number * 1e3,
+            timeit(lambda: ECPoint.multi_multiply(terms, method="strauss"),
+                   number=number) / number * 1e3,
+            timeit(lambda: ECPoint.multi_multiply(terms, method="pippenger"),
+                   number=number) / number * 1e3
+        ))
@@ -0,0 +1,246 @@
+import struct
+
+from btc.base58 import decode_check
+from btc.keys import KeysBTC
+from btc.bip32 import ExtendedKey, BIP32, GAP_LIMIT
+
+
+# The header of a saved index
+ADDRESS_INDEX_MAGIC = b"BTCADDRIDX1"
+# The length of HASH160
+HASH160_LEN = 20
+# A placeholder of HASH160 for an invalid child key (skipped index)
+_NO_HASH = b"\x00" * HASH160_LEN
+
+
+class AddressIndex:
+    """Represents a reverse index of the addresses of watch-only wallets:
+    HASH160 (or an address) -> (account, chain, index).
+
+    Every chain (ex. m/44'/0'/<account>'/<chain>) is an extended public
+    key; its addresses are derived in order and kept gap_limit beyond
+    the last used one, so the index extends itself as the addresses are
+    used. A lookup is one dict access, the HASH160 of each chain are also
+    kept in one bytearray which is saved as is.
+    """
+
+    def __init__(self, gap_limit=GAP_LIMIT, version: int = None):
+        """Construct an object.
+
+        Parameters:
+            gap_limit -- the number of unused addresses after the last
+                         used one in each chain,
+            version -- the address version (None - mainnet).
+        """
+        self.gap_limit = gap_limit
+        self.version = KeysBTC.get_addr_ver_main() \
+            if version is None else version
+        # The chains: {"account", "chain", "parent", "hashes", "last_used"}
+        self._chains = []
+        self._chain_ids = {}
+        # HASH160 -> chain id << 32 | index
+        self._index = {}
+
+
+    def __repr__(self):
+        return \
+            str({
+                "chains": len(self._chains),
+                "addresses": len(self._index),
+                "gap_limit": self.gap_limit,
+                "version": self.version
+            })
+
+
+    def __len__(self):
+        return len(self._index)
+
+
+    def __contains__(self, key):
+        return self.lookup(key) is not None
+
+
+    def add_chain(self, account: int, chain: int, parent_pub: ExtendedKey,
+                  count: int = None):
+        """Add a chain of addresses and derive its first addresses.
+
+        Parameters:
+            account -- the number of the account,
+            chain -- the number of the chain (ex. 0 - receive, 1 - change),
+            parent_pub -- the extended public key of the chain,
+            count -- the number of the first addresses (None - gap_limit).
+        """
+        if (account, chain) in self._chain_ids:
+            raise ValueError(
+                "The chain {:d}/{:d} is in the index".format(account, chain)
+            )
+        if not parent_pub.is_public():
+            raise ValueError("The chain key must be an extended public key")
+
+        self._chain_ids[(account, chain)] = len(self._chains)
+        self._chains.append({"account": account,
+                             "chain": chain,
+                             "parent": parent_pub,
+                             "hashes": bytearray(),
+                             "last_used": -1})
+        self.extend(account, chain,
+                    self.gap_limit if count is None else count)
+
+
+    def add_account(self, account: int, account_pub: ExtendedKey,
+                    chains=(0, 1)):
+        """Add the chains (receive and change) of an account.
+
+        Parameters:
+            account -- the number of the account,
+            account_pub -- the extended public key of the account
+                           (ex. m/44'/0'/<account>'),
+            chains -- the numbers of the chains.
+        """
+        for chain, chain_pub in zip(chains,
+                                    BIP32.pub_to_children(account_pub,
+                                                          chains)):
+            self.add_chain(account, chain, chain_pub)
+
+
+    def extend(self, account: int, chain: int, count: int):
+        """Derive the next count addresses of a chain"""
+        chain_id = self._chain_ids[(account, chain)]
+        item = self._chains[chain_id]
+        hashes = item["hashes"]
+        start = len(hashes) // HASH160_LEN
+
+        next_index = start
+        for index, public_key, pubkey_hash, address in BIP32.iter_addresses(
+                item["parent"], start, count, self.version):
+            # An invalid child key is skipped (a placeholder)
+            while next_index < index:
+                hashes += _NO_HASH
+                next_index += 1
+            hashes += pubkey_hash
+            self._index[pubkey_hash] = chain_id << 32 | index
+            next_index += 1
+
+
+    def lookup(self, key):
+        """Return (account, chain, index) for HASH160 (bytes) or an address
+        (str), None if it is not in the index (or the address has another
+        version, ex. P2SH or testnet)
+        """
+        if isinstance(key, str):
+            try:
+                t = decode_check(key)
+            except ValueError:
+                return None
+            if len(t) != HASH160_LEN + 1 or t[0] != self.version:
+                return None
+            key = t[1:]
+
+        value = self._index.get(key)
+        if value is None:
+            return None
+
+        item = self._chains[value >> 32]
+        return item["account"], item["chain"], value & 0xffffffff
+
+
+    def mark_used(self, key):
+        """Mark an address (HASH160 or str) as used and extend its chain
+        to gap_limit addresses after the last used one.
+
+        Return (account, chain, index) or None if it is not in the index.
+        """
+        path = self.lookup(key)
+        if path is None:
+            return None
+
+        account, chain, index = path
+        item = self._chains[self._chain_ids[(account, chain)]]
+        if index > item["last_used"]:
+            item["last_used"] = index
+            count = len(item["hashes"]) // HASH160_LEN
+            if index + self.gap_limit >= count:
+                self.extend(account, chain, index + self.gap_limit + 1 - count)
+
+        return path
+
+
+    def get_address(self, account: int, chain: int, index: int):
+        """Return the address of a derived index"""
+        hashes = self._chains[self._chain_ids[(account, chain)]]["hashes"]
+        pubkey_hash = bytes(hashes[index * HASH160_LEN :
+                                   (index + 1) * HASH160_LEN])
+        if len(pubkey_hash) != HASH160_LEN or pubkey_hash == _NO_HASH:
+            raise ValueError(
+                "The index {:d}/{:d}/{:d} is not derived".format(account,
+                                                                chain, index)
+            )
+        return KeysBTC.pubkey_hash_to_address(pubkey_hash, self.version)
+
+
+    def save(self, file_name: str):
+        """Save the index into a binary file.
+
+        The file has the chains (extended public keys, the last used
+        indexes) and the HASH160 of the derived addresses, so the index
+        is loaded without the derivation.
+        """
+        with open(file_name, "wb") as f:
+            f.write(ADDRESS_INDEX_MAGIC)
+            f.write(struct.pack("<IBI", self.gap_limit, self.version,
+                                len(self._chains)))
+            for item in self._chains:
+                parent = item["parent"].serialize().encode()
+                f.write(struct.pack("<IIiIB", item["account"], item["chain"],
+                                    item["last_used"],
+                                    len(item["hashes"]) // HASH160_LEN,
+                                    len(parent)))
+                f.write(parent)
+                f.write(item["hashes"])
+
+
+    @staticmethod
+    def load(file_name: str):
+        """Return an AddressIndex loaded from a binary file (see save)"""
+        with open(file_name, "rb") as f:
+            data = f.read()
+
+        if not data.startswith(ADDRESS_INDEX_MAGIC):
+            raise ValueError(
+                "Invalid file of the address index: {:s}".format(file_name)
+            )
+        offset = len(ADDRESS_INDEX_MAGIC)
+        gap_limit, version, chains = struct.unpack_from("<IBI", data, offset)
+        offset += struct.calcsize("<IBI")
+
+        index = AddressIndex(gap_limit, version)
+        view = memoryview(data)
+        for chain_id in range(chains):
+            account, chain, last_used, count, parent_len = \
+                struct.unpack_from("<IIiIB", data, offset)
+            offset += struct.calcsize("<IIiIB")
+            parent = ExtendedKey(bytes(), bytes())
+            parent.deserialize(bytes(view[offset : offset + parent_len])
+                               .decode())
+            offset += parent_len
+            hashes = bytearray(view[offset : offset + count * HASH160_LEN])
+            offset += count * HASH160_LEN
+            if len(hashes) != count * HASH160_LEN:
+                raise ValueError(
+                    "Truncated file of the address index: {:s}".format(
+                        file_name)
+                )
+
+            index._chain_ids[(account, chain)] = chain_id
+            index._chains.append({"account": account,
+                                  "chain": chain,
+                                  "parent": parent,
+                                  "hashes": hashes,
+                                  "last_used": last_used})
+            for i in range(count):
+                pubkey_hash = bytes(hashes[i * HASH160_LEN :
+                                           (i + 1) * HASH160_LEN])
+                if pubkey_hash != _NO_HASH:
+                    index._index[pubkey_hash] = chain_id << 32 | i
+
+        return index
@@ -0,0 +1,117 @@
+from hashlib import sha256
+
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+BASE58_COUNT = len(BASE58_ALPHABET)
+# The number of base58 digits converted with one big-integer operation
+BASE58_CHUNK = 10
+BASE58_CHUNK_BASE = BASE58_COUNT ** BASE58_CHUNK
+# The length of Base58Check checksum (bytes)
+BASE58_CHECKSUM_LEN = 4
+
+# Reverse lookup: a character -> its digit
+_DIGITS = {char: i for i, char in enumerate(BASE58_ALPHABET)}
+# Two digits at once: i -> BASE58_ALPHABET[i // 58] + BASE58_ALPHABET[i % 58]
+_PAIRS = [a + b for a in BASE58_ALPHABET for b in BASE58_ALPHABET]
+_PAIR_BASE = BASE58_COUNT ** 2
+
+
+def encode_int(num: int):
+    """Encode a non-negative integer to base58 digits (str).
+
+    The integer is divided by 58^10 at a time, every chunk gives
+    10 digits (two digits per step). 0 is encoded to an empty string.
+    """
+    encoded = []
+    append = encoded.append
+    while num:
+        num, chunk = divmod(num, BASE58_CHUNK_BASE)
+        # The pairs of digits from the least significant
+        for _ in range(BASE58_CHUNK // 2):
+            chunk, pair = divmod(chunk, _PAIR_BASE)
+            append(_PAIRS[pair])
+    encoded.reverse()
+
+    # The most significant chunk has leading zero digits
+    return "".join(encoded).lstrip(BASE58_ALPHABET[0])
+
+
+def decode_int(s: str):
+    """Decode base58 digits (str) to an integer.
+
+    Raise ValueError if s has an invalid character.
+    """
+    try:
+        digits = [_DIGITS[char] for char in s]
+    except KeyError as err:
+        raise ValueError(
+            "Invalid base58 character: {:s}".format(str(err))
+        ) from None
+
+    num = 0
+    # The first chunk may be shorter
+    start = len(digits) % BASE58_CHUNK or BASE58_CHUNK
+    for end in range(start, len(digits) + 1, BASE58_CHUNK):
+        chunk = 0
+        for d in digits[max(0, end - BASE58_CHUNK) : end]:
+            chunk = chunk * BASE58_COUNT + d
+        num = num * BASE58_CHUNK_BASE + chunk
+
+    return num
+
+
+def encode(data: bytes):
+    """Encode bytes to a base58 string, leading zero bytes are "1"."""
+    zeros = len(data) - len(data.lstrip(b"\x00"))
+
+    return BASE58_ALPHABET[0] * zeros + \
+        encode_int(int.from_bytes(data, byteorder="big"))
+
+
+def decode(s: str):
+    """Decode a base58 string to bytes, leading "1" are zero bytes."""
+    zeros = len(s) - len(s.lstrip(BASE58_ALPHABET[0]))
+    num = decode_int(s[zeros:])
+
+    return b"\x00" * zeros + \
+        num.to_bytes((num.bit_length() + 7) // 8, byteorder="big")
+
+
+def get_checksum(payload: bytes):
+    """Return Base58Check checksum: first 4 bytes of double SHA256"""
+    return sha256(sha256(payload).digest()).digest()[:BASE58_CHECKSUM_LEN]
+
+
+def encode_check(payload: bytes):
+    """Encode bytes with the checksum to a base58 string (Base58Check)"""
+    return encode(payload + get_checksum(payload))
+
+
+def decode_check(s: str):
+    """Decode a Base58Check string to bytes (without the checksum).
+
+    Raise ValueError if the checksum is incorrect.
+    """
+    data = decode(s)
+    payload = data[:-BASE58_CHECKSUM_LEN]
+    if len(data) < BASE58_CHECKSUM_LEN or \
+            get_checksum(payload) != data[-BASE58_CHECKSUM_LEN:]:
+        raise ValueError("Incorrect checksum for: {:s}".format(s))
+
+    return payload
+
+
+def encode_many(payloads, check=False):
+    """Return a list with the base58 strings for a list of bytes,
+    with the checksums (Base58Check) if check is True.
+    """
+    encoder = encode_check if check else encode
+    return [encoder(payload) for payload in payloads]
+
+
+def decode_many(strings, check=False):
+    """Return a list with bytes for a list of base58 strings,
+    the checksums are checked (Base58Check) if check is True.
+    """
+    decoder = decode_check if check else decode
+    return [decoder(s) for s in strings]
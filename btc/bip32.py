@@ -1,5 +1,9 @@
-from btc.utils import hmac_sha512, sha256, ripemd160, base58_encode, \
-    base58_decode, int2bytes, bytes2int
+import re
+from collections import OrderedDict
+
+from btc.utils import HmacSha, hmac_sha512, sha256, ripemd160, int2bytes, \
+    bytes2int
+from btc.base58 import encode_check, decode_check
 from btc.ecpoint import ECPoint
 from btc.keys import KeysBTC
 
@@ -8,6 +12,17 @@ MAINNET_PUBLIC = b"\x04\x88\xb2\x1e"
 MAINNET_PRIVATE = b"\x04\x88\xad\xe4"
 TESTNET_PUBLIC = b"\x04\x35\x87\xcf"
 TESTNET_PRIVATE = b"\x04\x35\x83\x94"
+# The default number of derived nodes in DerivationCache
+DERIVATION_CACHE_CAPACITY = 1024
+# The number of child public keys derived together in the range derivation
+PUB_RANGE_BATCH_SIZE = 256
+# The default number of unused addresses in a row which stop a scan
+GAP_LIMIT = 20
+# The first hardened index and the number of indexes of each kind
+HARDENED_OFFSET = 2 ** 31
+# A level of a path: an index, a range, "*" or {...}, and ' or h if hardened
+_PATH_LEVEL = re.compile(r"^(?:\{([0-9,\- ]+)\}|([0-9]+(?:-[0-9]+)?|\*))"
+                         r"(['hH]?)$")
 
 
 class ExtendedKey:
@@ -30,6 +45,10 @@ class ExtendedKey:
         self.level = level
         self.index = index
         self.fingerprint = fingerprint
+        # HMAC-SHA512 context keyed with the chain code (see get_hmac)
+        self._hmac = None
+        # The public point, key and fingerprint (see get_public_point)
+        self._public = None
 
 
     def __repr__(self):
@@ -44,6 +63,17 @@ class ExtendedKey:
             })
 
 
+    def copy(self):
+        """Return a copy of this key (with the computed HMAC context
+        and public key)
+        """
+        key = ExtendedKey(self.key, self.chain_code, self.level, self.index,
+                          self.fingerprint)
+        key._hmac = self._hmac
+        key._public = self._public
+        return key
+
+
     def is_public(self):
         """Return True if this is an extended public key"""
         return isinstance(self.key, ECPoint)
@@ -73,24 +103,26 @@ class ExtendedKey:
                 self.fingerprint +
                 int2bytes(self.index, 4) +
                 self.chain_code +
-                KeysBTC.point_to_publickey(self.key)
+                self.get_public_key()
             )
         else:
             raise ValueError("Invalid extended key")
 
-        checksum = sha256(sha256(ser_key))[:4]
-
-        return base58_encode(ser_key + checksum)
+        return encode_check(ser_key)
 
 
     def deserialize(self, ser_key: str):
         """Deserialize a serialized key into self"""
-        ser_key = base58_decode(ser_key, 82)
-
         # Checksum
-        if sha256(sha256(ser_key[:78]))[:4] != ser_key[78:]:
+        try:
+            ser_key = decode_check(ser_key)
+        except ValueError:
             raise ValueError(
-                "Wrong checksum of the extended key: {:s}".format(ser_key.hex())
+                "Wrong checksum of the extended key: {:s}".format(ser_key)
+            )
+        if len(ser_key) != 78:
+            raise ValueError(
+                "Invalid serialized extended key: {:s}".format(ser_key.hex())
             )
 
         self.level = ser_key[4]
@@ -102,23 +134,61 @@ class ExtendedKey:
             # Miss 00 and get the private key
             self.key = ser_key[46:78]
         elif ser_key[:4] == MAINNET_PUBLIC:
-            # Get x coordinate of the public point
-            x = bytes2int(ser_key[46:78])
-            # Calculate y coordinate of the public point
-            y = ECPoint.get_secp256k1_y(x)
-            # Choice even y if prefix = 02, else choice odd y
-            if ser_key[45] == 2:
-                y = ECPoint.get_secp256k1_p() - y if y % 2 != 0 else y
-            else:
-                y = ECPoint.get_secp256k1_p() - y if y % 2 == 0 else y
-
-            self.key = ECPoint(x, y)
+            # Get the public point by x coordinate and the prefix of y
+            self.key = KeysBTC.publickey_to_point(ser_key[45:78])
         else:
             raise ValueError(
                 "Invalid serialized extended key: {:s}".format(ser_key.hex())
             )
 
 
+    def get_hmac(self):
+        """Return HMAC-SHA512 context (HmacSha) keyed with the chain code.
+
+        The context is created once and reused for all the children,
+        a new one is created if the chain code is replaced.
+        """
+        if self._hmac is None or self._hmac[0] is not self.chain_code:
+            self._hmac = (self.chain_code, HmacSha(self.chain_code, "512"))
+
+        return self._hmac[1]
+
+
+    def _get_public(self):
+        """Return the cached couple (public point, compressed public key)"""
+        if self._public is None or self._public[0] is not self.key:
+            if self.is_private():
+                point = KeysBTC(self.key).get_public_point()
+            elif self.is_public():
+                point = self.key
+            else:
+                raise ValueError("Invalid extended key")
+            self._public = (self.key, point,
+                            KeysBTC.point_to_publickey(point), None)
+
+        return self._public
+
+
+    def get_public_point(self):
+        """Return the public point of this key (computed once)"""
+        return self._get_public()[1]
+
+
+    def get_public_key(self):
+        """Return the compressed public key (bytes) of this key"""
+        return self._get_public()[2]
+
+
+    def get_key_fingerprint(self):
+        """Return the fingerprint of this key (for the children)"""
+        key, point, public_key, fingerprint = self._get_public()
+        if fingerprint is None:
+            fingerprint = ExtendedKey.get_fingerprint(public_key)
+            self._public = (key, point, public_key, fingerprint)
+
+        return fingerprint
+
+
     @staticmethod
     def get_fingerprint(public_key):
         """Return first 4 bytes of HASH160 of the public_key"""
@@ -140,24 +210,205 @@ class ExtendedKey:
         return ExtendedKey(key, chain_code)
 
 
+class DerivationCache:
+    """Represents an LRU cache of the derived nodes of a key hierarchy.
+
+    A node is a couple of extended keys {"private", "public"} (or
+    the error messages) keyed by its path (tuple of indexes). The keys
+    keep their public points and fingerprints, so the children of
+    a cached node cost only the last level.
+    """
+
+    def __init__(self, capacity=DERIVATION_CACHE_CAPACITY):
+        """Construct an object.
+
+        Parameters:
+            capacity -- the maximum number of nodes.
+        """
+        self.capacity = capacity
+        self._nodes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __repr__(self):
+        return \
+            str({
+                "nodes": len(self._nodes),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses
+            })
+
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+    def get(self, path: tuple):
+        """Return the node for the path or None"""
+        node = self._nodes.get(path)
+        if node is None:
+            self.misses += 1
+            return None
+
+        self._nodes.move_to_end(path)
+        self.hits += 1
+        return node
+
+
+    def add(self, path: tuple, node: dict):
+        """Add the node for the path"""
+        self._nodes[path] = node
+        self._nodes.move_to_end(path)
+
+        # Remove the least recently used nodes
+        while len(self._nodes) > self.capacity:
+            self._nodes.popitem(last=False)
+
+
+    def clear(self):
+        """Remove all the nodes and reset the counters"""
+        self._nodes.clear()
+        self.hits = self.misses = 0
+
+
+class DerivationPath:
+    """Represents a compiled path expression of a key hierarchy (BIP32).
+
+    The levels are separated by "/" after the optional root "m":
+    an index (5), a range (0-999), all the indexes (*) or a list of
+    indexes and ranges ({0,2,5-9}); ' or h after a level means
+    the hardened indexes, ex. "m/44'/0'/0'/0/*" or "m/84h/0h/{0-9}'/0/0-999".
+    An index repeated in a list ({1,1} or {0-5,3-7}) is taken once.
+    """
+
+    def __init__(self, path: str):
+        """Construct an object.
+
+        Parameters:
+            path -- a path expression (str).
+        Raise ValueError if the path is invalid.
+        """
+        self.path = path
+        # A level is a list of ranges of indexes
+        self.levels = []
+
+        parts = path.strip().split("/")
+        if parts[0] in ("m", "M"):
+            parts = parts[1:]
+        for part in parts:
+            match = _PATH_LEVEL.match(part.strip())
+            if match is None:
+                raise ValueError(
+                    "Invalid level {:s} in the path {:s}".format(part, path)
+                )
+            items, single, hardened = match.groups()
+            offset = HARDENED_OFFSET if hardened else 0
+
+            ranges = []
+            for item in (items.split(",") if items else [single]):
+                item = item.strip()
+                if item == "*":
+                    first, last = 0, HARDENED_OFFSET - 1
+                else:
+                    bounds = item.split("-")
+                    if len(bounds) > 2 or not all(bounds):
+                        raise ValueError(
+                            "Invalid range {:s} in the path {:s}".format(
+                                item, path)
+                        )
+                    first, last = int(bounds[0]), int(bounds[-1])
+                if first > last or last >= HARDENED_OFFSET:
+                    raise ValueError(
+                        "Invalid range {:s} in the path {:s}".format(item,
+                                                                     path)
+                    )
+                pieces = [range(offset + first, offset + last + 1)]
+                # Skip the indexes of the previous items of the list
+                for r in ranges:
+                    pieces = [piece for p in pieces
+                              for piece in (range(p.start,
+                                                  min(p.stop, r.start)),
+                                            range(max(p.start, r.stop),
+                                                  p.stop))
+                              if piece]
+                ranges.extend(pieces)
+            self.levels.append(ranges)
+
+
+    def __repr__(self):
+        return self.path
+
+
+    def __len__(self):
+        return len(self.levels)
+
+
+    def is_pattern(self):
+        """Return True if a level has more than one index"""
+        return self.count() != 1
+
+
+    def count(self):
+        """Return the number of the leaves (the expanded paths)"""
+        result = 1
+        for level in self.levels:
+            result *= sum(len(r) for r in level)
+        return result
+
+
+    def iter_level(self, level: int):
+        """Return a generator of the indexes of a level"""
+        for r in self.levels[level]:
+            yield from r
+
+
+    def get_indexes(self):
+        """Return the list of indexes if the path is not a pattern"""
+        if self.is_pattern():
+            raise ValueError(
+                "The path {:s} has many leaves".format(self.path)
+            )
+        return [level[0][0] for level in self.levels]
+
+
+    def iter_indexes(self, level: int = 0):
+        """Return a generator of the expanded paths (tuples of indexes)
+        from a level (lazily, the levels are not expanded in memory)
+        """
+        if level == len(self.levels):
+            yield ()
+            return
+        for index in self.iter_level(level):
+            for indexes in self.iter_indexes(level + 1):
+                yield (index,) + indexes
+
+
 class BIP32:
     """Represents hierarchy deterministic keys BIP32"""
 
-    def __init__(self, master: ExtendedKey, level_indexes=None):
+    def __init__(self, master: ExtendedKey, level_indexes=None,
+                 cache_capacity=DERIVATION_CACHE_CAPACITY):
         """Construct an object.
 
         Parameters:
         master -- an extended master (root) key (ExtendedKey)
-        level_indexes -- a path to the last key level (list),
-                         ex. for m/0/1/0/<list> - [0, 1, 0]
+        level_indexes -- a path to the last key level (list or str),
+                         ex. for m/0/1/0/<list> - [0, 1, 0] or "m/0/1/0"
+        cache_capacity -- the number of derived nodes in the cache
+                          (DerivationCache)
         """
+        if isinstance(level_indexes, str):
+            level_indexes = DerivationPath(level_indexes).get_indexes()
         self.level_indexes = [] if level_indexes is None else level_indexes
+        self.cache = DerivationCache(cache_capacity)
 
         if master.is_private():
             self.master_prv = master
             self.master_pub = \
                 ExtendedKey(
-                    KeysBTC(self.master_prv.key).get_public_point(),
+                    self.master_prv.get_public_point(),
                     self.master_prv.chain_code
                 )
         elif master.is_public():
@@ -181,20 +432,19 @@ class BIP32:
             parent_prv -- a parent private key,
             index -- an index of a parent private key
         """
-        cur_key = KeysBTC(parent_prv.key)
         ser32_index = int2bytes(index, 4)
 
         # If a hardened index the take the private key,
-        # otherwise, take the public key.
+        # otherwise, take the public key (computed once for the parent).
         if index >= 2 ** 31:
-            data = b"\x00" + cur_key.get_private_key() + ser32_index
+            data = b"\x00" + parent_prv.key + ser32_index
         else:
-            data = cur_key.get_public_key() + ser32_index
+            data = parent_prv.get_public_key() + ser32_index
 
-        child_hash = hmac_sha512(parent_prv.chain_code, data)
+        child_hash = parent_prv.get_hmac().digest(data)
 
         child_hash_left = bytes2int(child_hash[:32])
-        k_i = (child_hash_left + cur_key.get_private_key_int()) % \
+        k_i = (child_hash_left + bytes2int(parent_prv.key)) % \
               ECPoint.get_secp256k1_order()
         # Check the left part
         if child_hash_left >= ECPoint.get_secp256k1_order() or k_i == 0:
@@ -206,7 +456,7 @@ class BIP32:
             child_hash[32:],
             parent_prv.level + 1,    # increase level
             index,
-            ExtendedKey.get_fingerprint(cur_key.get_public_key())
+            parent_prv.get_key_fingerprint()
         )
 
 
@@ -226,17 +476,19 @@ class BIP32:
             )
 
         ser32_index = int2bytes(index, 4)
-        public_key = KeysBTC.point_to_publickey(parent_pub.key)
 
-        data = public_key + ser32_index
+        data = parent_pub.get_public_key() + ser32_index
 
-        child_hash = hmac_sha512(parent_pub.chain_code, data)
+        child_hash = parent_pub.get_hmac().digest(data)
 
         child_hash_left = bytes2int(child_hash[:32])
-        K_i = KeysBTC.get_generator_point() * child_hash_left + parent_pub.key
+        K_i = ECPoint.multi_multiply(
+            [(KeysBTC.get_generator_point(), child_hash_left),
+             (parent_pub.key, 1)]
+        )
         # Check the left part
         if child_hash_left >= ECPoint.get_secp256k1_order() or \
-                K_i == ECPoint.infinity():
+                K_i.is_infinity():
             raise ValueError(
                 "The resulting key is invalid for index {:d}".format(index)
             )
@@ -247,55 +499,307 @@ class BIP32:
             child_hash[32:],
             parent_pub.level + 1,    # increase level
             index,
-            ExtendedKey.get_fingerprint(public_key)
+            parent_pub.get_key_fingerprint()
         )
 
 
+    @staticmethod
+    def pub_to_children(parent_pub: ExtendedKey, index_list):
+        """Return a list with extended child public keys.
+
+        Parameters:
+            parent_pub -- a parent public key,
+            index_list -- indexes of the child public keys.
+        The child public points are converted to the affine form
+        together (one modular inversion for the whole list).
+        """
+        public_key = parent_pub.get_public_key()
+        fingerprint = parent_pub.get_key_fingerprint()
+        parent_hmac = parent_pub.get_hmac()
+
+        jobs = []
+        chain_codes = []
+        for index in index_list:
+            # Check if index is not a hardened key
+            if index >= 2 ** 31:
+                raise ValueError(
+                    "Cannot generate a child public key because "
+                    "it is a hardened key"
+                )
+
+            child_hash = parent_hmac.digest(public_key + int2bytes(index, 4))
+            child_hash_left = bytes2int(child_hash[:32])
+            # Check the left part
+            if child_hash_left >= ECPoint.get_secp256k1_order():
+                raise ValueError(
+                    "The resulting key is invalid for index {:d}".format(index)
+                )
+
+            jobs.append([(KeysBTC.get_generator_point(), child_hash_left),
+                         (parent_pub.key, 1)])
+            chain_codes.append(child_hash[32:])
+
+        children = []
+        for index, K_i, chain_code in zip(index_list,
+                                          ECPoint.multi_multiply_batch(jobs),
+                                          chain_codes):
+            if K_i.is_infinity():
+                raise ValueError(
+                    "The resulting key is invalid for index {:d}".format(index)
+                )
+            children.append(
+                ExtendedKey(K_i, chain_code, parent_pub.level + 1, index,
+                            fingerprint)
+            )
+
+        return children
+
+
+    def derive_node(self, level_indexes):
+        """Return a couple of the extended keys {"private", "public"}
+        for a path from the master (root) keys.
+
+        Parameters:
+            level_indexes -- a path to the key (list or tuple),
+                             ex. for m/0/1/0 - [0, 1, 0].
+        Only the levels after the longest cached path are derived,
+        the key is an error message (str) if it cannot be derived.
+        The result is a new dict of the copies of the keys (the cached
+        ones cannot be changed).
+        """
+        path = tuple(level_indexes)
+        for index in path:
+            if not isinstance(index, int):
+                raise ValueError("Wrong index in the list")
+
+        # The longest cached path
+        node = None
+        level = len(path)
+        while level > 0:
+            node = self.cache.get(path[:level])
+            if node is not None:
+                break
+            level -= 1
+        if node is None:
+            # The root is the couple of the master keys
+            node = {"private": self.master_prv,
+                    "public": self.master_pub}
+
+        # For each next level calculate an apropriate key
+        for level in range(level, len(path)):
+            node = self.child_node(node, path[level])
+            self.cache.add(path[:level + 1], node)
+
+        return {name: key.copy() if isinstance(key, ExtendedKey) else key
+                for name, key in node.items()}
+
+
+    @staticmethod
+    def child_node(node, index: int):
+        """Return a couple of the child extended keys {"private", "public"}
+        for a couple of the parent keys (see derive_node)
+        """
+        parent_prv = node["private"]
+        parent_pub = node["public"]
+
+        # Calculate a child private key if the parent private key exists
+        try:
+            if isinstance(parent_prv, ExtendedKey):
+                parent_prv = BIP32.prv_to_child(parent_prv, index)
+        except ValueError as err:
+            parent_prv = str(err)
+
+        # Calculate a child public key if the parent public key exists
+        try:
+            if isinstance(parent_pub, ExtendedKey):
+                parent_pub = BIP32.pub_to_child(parent_pub, index)
+        except ValueError as err:
+            parent_pub = str(err)
+
+        return {"private": parent_prv,
+                "public": parent_pub}
+
+
+    def iter_path(self, path):
+        """Return a generator of the leaves of a path expression.
+
+        Parameters:
+            path -- a path expression (DerivationPath or str),
+                    ex. "m/44'/0'/{0-9}'/0/0-999".
+        Yield couples (indexes, node), where indexes is a tuple (the path
+        of the leaf) and node is a couple of the extended keys
+        {"private", "public"} (see derive_node). The levels before the
+        first pattern come from the cache, every other node is derived
+        once for all its leaves (depth-first, lazily).
+        """
+        if isinstance(path, str):
+            path = DerivationPath(path)
+
+        # The common prefix (one index on each level)
+        prefix = []
+        for level in range(len(path)):
+            if len(path.levels[level]) != 1 or \
+                    len(path.levels[level][0]) != 1:
+                break
+            prefix.append(path.levels[level][0][0])
+        root = self.derive_node(prefix)
+
+        # The stack of generators of the children on each level
+        indexes = list(prefix)
+        nodes = [root]
+        levels = [path.iter_level(len(prefix))] \
+            if len(prefix) < len(path) else []
+        if not levels:
+            yield tuple(indexes), root
+        while levels:
+            index = next(levels[-1], None)
+            if index is None:
+                # The level is done, return to the parent level
+                levels.pop()
+                if levels:
+                    nodes.pop()
+                    indexes.pop()
+                continue
+
+            node = self.child_node(nodes[-1], index)
+            if len(indexes) + 1 < len(path):
+                indexes.append(index)
+                nodes.append(node)
+                levels.append(path.iter_level(len(indexes)))
+            else:
+                yield tuple(indexes) + (index,), node
+
+
+    @staticmethod
+    def iter_pub_children(parent_pub: ExtendedKey, start=0, count=None,
+                          batch_size=PUB_RANGE_BATCH_SIZE):
+        """Return a generator of extended child public keys with
+        the indexes start, start + 1, ...
+
+        Parameters:
+            parent_pub -- a parent public key,
+            start -- the first index,
+            count -- the number of indexes (None - up to the hardened keys),
+            batch_size -- the number of children derived together
+                          (see pub_to_children).
+        The parent public key and HMAC state are computed once, the keys
+        are derived lazily batch by batch, so the caller may stop at any
+        index. An invalid child key (probability < 2^-127) is skipped.
+        """
+        if batch_size < 1:
+            raise ValueError("The batch size must be positive")
+        if start < 0:
+            raise ValueError("The first index must not be negative")
+        end = 2 ** 31 if count is None else start + count
+        if end > 2 ** 31:
+            raise ValueError(
+                "Cannot generate a child public key because "
+                "it is a hardened key"
+            )
+
+        index = start
+        while index < end:
+            indexes = range(index, min(end, index + batch_size))
+            try:
+                children = BIP32.pub_to_children(parent_pub, indexes)
+            except ValueError:
+                # Derive the batch one by one without the invalid keys
+                children = []
+                for i in indexes:
+                    try:
+                        children.append(BIP32.pub_to_child(parent_pub, i))
+                    except ValueError:
+                        pass
+
+            yield from children
+            index = indexes.stop
+
+
+    @staticmethod
+    def iter_addresses(parent_pub: ExtendedKey, start=0, count=None,
+                       version=None, batch_size=PUB_RANGE_BATCH_SIZE):
+        """Return a generator of the addresses of the child public keys
+        (see iter_pub_children).
+
+        Parameters:
+            version -- the address version (None - mainnet).
+        Yield tuples (index, public_key, pubkey_hash, address).
+        """
+        for child in BIP32.iter_pub_children(parent_pub, start, count,
+                                             batch_size):
+            public_key = child.get_public_key()
+            pubkey_hash = ripemd160(sha256(public_key))
+            yield (child.index,
+                   public_key,
+                   pubkey_hash,
+                   KeysBTC.pubkey_hash_to_address(pubkey_hash, version))
+
+
+    @staticmethod
+    def scan_addresses(parent_pub: ExtendedKey, is_used, gap_limit=GAP_LIMIT,
+                       start=0, version=None,
+                       batch_size=PUB_RANGE_BATCH_SIZE):
+        """Return a generator of the used addresses of the child public
+        keys up to a gap of unused addresses (a wallet rescan).
+
+        Parameters:
+            parent_pub -- a parent public key (ex. m/44'/0'/0'/0),
+            is_used -- a function is_used(address) -> True if the address
+                       has transactions,
+            gap_limit -- the number of unused addresses in a row
+                         which stop the scan,
+            start -- the first index,
+            version -- the address version (None - mainnet),
+            batch_size -- the number of children derived together.
+        Yield tuples (index, public_key, pubkey_hash, address), the range
+        is extended after every used address.
+        """
+        if gap_limit < 1:
+            raise ValueError("The gap limit must be positive")
+        # Do not derive much more than the gap
+        batch_size = min(batch_size, gap_limit)
+        unused = 0
+        for item in BIP32.iter_addresses(parent_pub, start, None, version,
+                                         batch_size):
+            if is_used(item[3]):
+                unused = 0
+                yield item
+            else:
+                unused += 1
+                if unused >= gap_limit:
+                    break
+
+
     def build_keys_path(self, level_indexes = None):
         """Build a key chain to the last key level.
 
         Parameters:
-            level_indexes -- a path to the last key level (list),
+            level_indexes -- a path to the last key level (list or str),
                              ex. for m/0/1/0/<list> - [0, 1, 0].
+        The derived keys are taken from the cache (see derive_node).
         """
+        if isinstance(level_indexes, str):
+            level_indexes = DerivationPath(level_indexes).get_indexes()
         self.level_indexes = level_indexes \
             if level_indexes else self.level_indexes
 
-        parent_prv = self.master_prv
-        parent_pub = self.master_pub
         # keys_path -- the list with the couples of extended keys
         # {"private", "public"} for each level in level_indexes.
         #
         # The root is the couple of the master keys
         self.keys_path = [
-            {"private": parent_prv,
-             "public": parent_pub}
+            {"private": self.master_prv,
+             "public": self.master_pub}
         ]
 
-        # For each level calculate an apropriate key
-        for level in range(0, len(self.level_indexes)):
-            index = self.level_indexes[level]
-            if not isinstance(index, int):
-                raise ValueError("Wrong index in the list")
-
-            # Calculate a child private key if the parent private key exists
-            try:
-                if parent_prv is not None:
-                    parent_prv = self.prv_to_child(parent_prv, index)
-            except ValueError as err:
-                parent_prv = str(err)
-
-            # Calculate a child public key if the parent public key exists
-            try:
-                if parent_pub is not None:
-                    parent_pub = self.pub_to_child(parent_pub, index)
-            except ValueError as err:
-                parent_pub = str(err)
-
+        # The last node derives (and caches) all the levels
+        last = self.derive_node(self.level_indexes)
+        for level in range(1, len(self.level_indexes)):
             self.keys_path.append(
-                {"private": parent_prv,
-                 "public": parent_pub}
+                self.derive_node(self.level_indexes[:level])
             )
+        if self.level_indexes:
+            self.keys_path.append(last)
         return
 
 
@@ -325,8 +829,23 @@ class BIP32:
         self.build_keys_path()
 
         # Derivate child keys from the last key in the key_path
-        return [
-            self.pub_to_child(self.keys_path[-1]["public"], index)
-                for index in index_list
-        ]
+        return self.pub_to_children(self.keys_path[-1]["public"],
+                                    list(index_list))
+
+
+    def ckd_pub_range(self, start=0, count=None,
+                      batch_size=PUB_RANGE_BATCH_SIZE):
+        """Children key derivation (CKDpub) of a range of indexes.
+
+        Parameters:
+            start -- the first index,
+            count -- the number of indexes (None - up to the hardened keys),
+            batch_size -- the number of children derived together.
+        Return -- a generator of the extended public child keys
+                  (see iter_pub_children).
+        """
+        self.build_keys_path()
+
+        return self.iter_pub_children(self.keys_path[-1]["public"], start,
+                                      count, batch_size)
 
@@ -0,0 +1,129 @@
+# The tags of DER
+DER_SEQUENCE = 0x30
+DER_INTEGER = 0x02
+# The lengths of a DER signature (without a hash type)
+DER_SIGNATURE_MIN_LEN = 8
+DER_SIGNATURE_MAX_LEN = 72
+
+
+def encode_signature(r: int, s: int):
+    """Return a DER signature (bytes) for the integers r and s.
+
+    The integers are encoded with minimal length (strict DER).
+    """
+    if r <= 0 or s <= 0:
+        raise ValueError("The integers of a signature must be positive")
+    r_len = r.bit_length() // 8 + 1
+    s_len = s.bit_length() // 8 + 1
+    if r_len + s_len + 6 > DER_SIGNATURE_MAX_LEN:
+        raise ValueError("The integers of a signature are too long")
+
+    return b"".join((
+        bytes((DER_SEQUENCE, r_len + s_len + 4, DER_INTEGER, r_len)),
+        r.to_bytes(r_len, byteorder="big"),
+        bytes((DER_INTEGER, s_len)),
+        s.to_bytes(s_len, byteorder="big")
+    ))
+
+
+def find_signature(data, offset=0):
+    """Check a strict DER signature at offset of data (bytes, bytearray
+    or memoryview).
+
+    Return -- a tuple (r_start, r_end, s_start, end) of the bounds of
+              r and s (without a leading zero), s ends at end (the offset
+              after the signature).
+    Raise ValueError if the encoding is not strict DER (BIP66).
+    """
+    # The sequence of two integers: 30 <len> 02 <len R> R 02 <len S> S
+    try:
+        tag, total, r_tag, r_len = data[offset : offset + 4]
+    except ValueError:
+        raise ValueError(
+            "Too short DER signature at {:d}".format(offset)
+        ) from None
+    total += 2
+    end = offset + total
+    if tag != DER_SEQUENCE or total < DER_SIGNATURE_MIN_LEN or \
+            total > DER_SIGNATURE_MAX_LEN or end > len(data):
+        raise ValueError("Invalid DER signature at {:d}".format(offset))
+    if r_tag != DER_INTEGER or r_len == 0 or r_len + 5 >= total:
+        raise ValueError("Invalid R of DER signature at {:d}".format(offset))
+    r_start = offset + 4
+    r_end = r_start + r_len
+    s_start = r_end + 2
+    s_len = data[r_end + 1]
+    if data[r_end] != DER_INTEGER or s_len == 0 or \
+            s_start + s_len != end:
+        raise ValueError("Invalid S of DER signature at {:d}".format(offset))
+
+    # Positive integers, a leading zero only before the highest bit set
+    r_first = data[r_start]
+    s_first = data[s_start]
+    if r_first == 0 and r_len > 1 and data[r_start + 1] > 0x7f:
+        r_start += 1
+    elif r_first > 0x7f or r_first == 0:
+        raise ValueError(
+            "Invalid integer R of DER signature at {:d}".format(offset)
+        )
+    if s_first == 0 and s_len > 1 and data[s_start + 1] > 0x7f:
+        s_start += 1
+    elif s_first > 0x7f or s_first == 0:
+        raise ValueError(
+            "Invalid integer S of DER signature at {:d}".format(offset)
+        )
+
+    return r_start, r_end, s_start, end
+
+
+def parse_signature(data, offset=0):
+    """Parse a strict DER signature at offset of data without copying.
+
+    Return -- a tuple (r, s, end), where r and s are memoryviews of
+              the integer bytes (without a leading zero) and end is
+              the offset after the signature.
+    Raise ValueError if the encoding is not strict DER (see
+    find_signature).
+    """
+    view = data if isinstance(data, memoryview) else memoryview(data)
+    r_start, r_end, s_start, end = find_signature(view, offset)
+
+    return view[r_start : r_end], view[s_start : end], end
+
+
+def decode_signature(data):
+    """Return a tuple (r, s) of integers for a strict DER signature.
+
+    data must contain exactly one signature, else raise ValueError.
+    """
+    r_start, r_end, s_start, end = find_signature(data)
+    if end != len(data):
+        raise ValueError("Extra bytes after DER signature")
+
+    view = memoryview(data)
+    return int.from_bytes(view[r_start : r_end], byteorder="big"), \
+        int.from_bytes(view[s_start : end], byteorder="big")
+
+
+def iter_signatures(buffer, offset=0, end=None):
+    """Return a generator of couples (r, s) of integers for the DER
+    signatures written one after another in buffer (from offset to end).
+
+    Raise ValueError on the first malformed signature.
+    """
+    view = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+    if end is not None:
+        view = view[:end]
+    from_bytes = int.from_bytes
+    while offset < len(view):
+        r_start, r_end, s_start, end = find_signature(view, offset)
+        yield from_bytes(view[r_start : r_end], byteorder="big"), \
+            from_bytes(view[s_start : end], byteorder="big")
+        offset = end
+
+
+def decode_signatures(buffer, offset=0, end=None):
+    """Return a list of couples (r, s) of integers for the DER signatures
+    written one after another in buffer (see iter_signatures)
+    """
+    return list(iter_signatures(buffer, offset, end))
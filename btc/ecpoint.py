@@ -1,4 +1,7 @@
-from btc.utils import mod_inverse, int2hex
+import threading
+from collections import OrderedDict
+
+from btc.utils import mod_inverse, batch_mod_inverse, int2hex
 
 
 # Parameters for SECP256k1 elliptic curve (used by Bitcoin)
@@ -10,10 +13,67 @@ SECP256K1_P = 2**256 - 2**32 - 2**9 - 2**8 - 2**7 - 2**6 - 2**4 - 1
 SECP256K1_ORDER = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
 SECP256K1_ORDER_LEN = SECP256K1_ORDER.bit_length()
 SECP256K1_H = 1
+# Window width (bits) of the precomputed table for the generator point
+SECP256K1_G_WINDOW = 6
+# Endomorphism of SECP256k1 (GLV): lambda * (x, y) = (beta * x, y)
+SECP256K1_BETA = \
+    0x7ae96a2b657c07106e64479eac3434e99cf0497512f58995c1396c28719501ee
+SECP256K1_LAMBDA = \
+    0x5363ad4cc05c30e0a5261c028812645a122e22ea20816678df02967c1b23bd72
+# Short basis {(a1, b1), (a2, b2)} for splitting a scalar with lambda
+SECP256K1_GLV_A1 = 0x3086d221a7d46bcde86c90e49284eb15
+SECP256K1_GLV_B1 = -0xe4437ed6010e88286f547fa90abfe4c3
+SECP256K1_GLV_A2 = 0x114ca50f7a8e2f3f657c1108d9d44cfd8
+SECP256K1_GLV_B2 = 0x3086d221a7d46bcde86c90e49284eb15
+# Window width (bits) of wNAF for the variable-base multiplication
+WNAF_WINDOW = 5
+# The number of terms from which the multi-scalar multiplication
+# uses the bucket method (Pippenger) instead of interleaved wNAF (Strauss)
+PIPPENGER_MIN_TERMS = 20
+# TableCache keeps the counters of uses for capacity * factor points
+TABLE_CACHE_USES_FACTOR = 16
+
+# Construct ECPoints bypassing the immutability
+_new_object = object.__new__
+_set_attr = object.__setattr__
+
+
+class Curve:
+    """Represents parameters of an elliptic curve y^2 = x^3 + a*x + b (mod p)
+
+    Use Curve.get() to get a shared object for the parameters.
+    """
+
+    __slots__ = ("a", "b", "mod")
+
+
+    def __init__(self, a, b, mod):
+        self.a, self.b, self.mod = a, b, mod
+
+
+    def __repr__(self):
+        return "Curve(a={:d}, b={:d}, mod={:x})".format(self.a, self.b,
+                                                         self.mod)
+
+
+    @staticmethod
+    def get(a, b, mod):
+        """Return the shared object with the curve parameters"""
+        curve = _CURVES.get((a, b, mod))
+        if curve is None:
+            curve = _CURVES.setdefault((a, b, mod), Curve(a, b, mod))
+        return curve
+
+
+_CURVES = {}
+SECP256K1_CURVE = Curve.get(SECP256K1_A, SECP256K1_B, SECP256K1_P)
 
 
 class ECPoint:
-    """Represents a point on an elliptic curve"""
+    """Represents a point on an elliptic curve (immutable)"""
+
+    __slots__ = ("x", "y", "curve")
+
 
     def __init__(self, x, y, a=SECP256K1_A, b=SECP256K1_B, mod=SECP256K1_P):
         """Construct an ECPoint on the elliptic curve:
@@ -25,7 +85,31 @@ class ECPoint:
             assert self.is_contained(x, y, a, b, mod), \
                    "The point {:x}, {:x} is not on " \
                    "the elliptic curve".format(x, y)
-        self.x, self.y, self.a, self.b, self.mod = x, y, a, b, mod
+        _set_attr(self, "x", x)
+        _set_attr(self, "y", y)
+        _set_attr(self, "curve", Curve.get(a, b, mod))
+
+
+    @staticmethod
+    def _make(x, y, curve: Curve):
+        """Construct an ECPoint without checks (for the computed points)"""
+        p = _new_object(ECPoint)
+        _set_attr(p, "x", x)
+        _set_attr(p, "y", y)
+        _set_attr(p, "curve", curve)
+        return p
+
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ECPoint is immutable")
+
+
+    def __delattr__(self, name):
+        raise AttributeError("ECPoint is immutable")
+
+
+    def __reduce__(self):
+        return ECPoint, (self.x, self.y, self.a, self.b, self.mod)
 
 
     def __add__(self, other):
@@ -47,13 +131,32 @@ class ECPoint:
         return (self.x == other.x) & (self.y == other.y)
 
 
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+
+    @property
+    def a(self):
+        return self.curve.a
+
+
+    @property
+    def b(self):
+        return self.curve.b
+
+
+    @property
+    def mod(self):
+        return self.curve.mod
+
+
     def add(self, p1, p2):
         """Return the sum of two ECPoint"""
         # The sum of infinity + p2 = p2
-        if p1 == ECPoint.infinity():
+        if p1.is_infinity():
             return p2
         # The sum of p1 + infinity = p1
-        if p2 == ECPoint.infinity():
+        if p2.is_infinity():
             return p1
 
         # Check if the points are on a vertical line
@@ -69,55 +172,189 @@ class ECPoint:
         #   x3 = s^2 - x1 - x2
         #   y3 = s(x1-x3) / y1
         # where s = (y2-y1) / (x2-x1)
-        p3 = ECPoint(0, 0, p1.a, p1.b, p1.mod)
-        dy = (p2.y - p1.y) % p1.mod
-        dx = (p2.x - p1.x) % p1.mod
-        s = (dy * mod_inverse(dx, p1.mod)) % p1.mod
-        p3.x = (s * s - p1.x - p2.x) % p1.mod
-        p3.y = (s * (p1.x - p3.x) - p1.y) % p1.mod
+        mod = p1.curve.mod
+        dy = (p2.y - p1.y) % mod
+        dx = (p2.x - p1.x) % mod
+        s = (dy * mod_inverse(dx, mod)) % mod
+        x3 = (s * s - p1.x - p2.x) % mod
+        y3 = (s * (p1.x - x3) - p1.y) % mod
 
-        return p3
+        return ECPoint._make(x3, y3, p1.curve)
 
 
     def double(self, p):
         """Return point * 2"""
-        if p == ECPoint.infinity():
+        if p.is_infinity():
             return ECPoint.infinity()
 
         # Sum point:
         #   x3 = s^2 - x1 - x2
         #   y3 = s*(x1-x3) / y1
         # where s = (3*x^2 + a) / 2*y1
-        p2 = ECPoint(0, 0, p.a, p.b, p.mod)
-        dy = (3 * p.x * p.x + p.a) % p.mod
-        dx = (2 * p.y) % p.mod
+        mod = p.curve.mod
+        dy = (3 * p.x * p.x + p.curve.a) % mod
+        dx = (2 * p.y) % mod
 
-        s = (dy * mod_inverse(dx, p.mod)) % p.mod
-        p2.x = (s * s - p.x - p.x) % p.mod
-        p2.y = (s * (p.x - p2.x) - p.y) % p.mod
+        s = (dy * mod_inverse(dx, mod)) % mod
+        x2 = (s * s - p.x - p.x) % mod
+        y2 = (s * (p.x - x2) - p.y) % mod
 
-        return p2
+        return ECPoint._make(x2, y2, p.curve)
 
 
-    def multiply(self, p, x):
-        """Return p * x = p + p + ... + p"""
-        temp = ECPoint(p.x, p.y, p.a, p.b, p.mod)
-        x = x - 1
+    def multiply(self, p, x, glv=True):
+        """Return p * x = p + p + ... + p
 
-        while x > 0:
-            if x % 2 != 0:
-                temp = self.double(temp) if temp == p else self.add(temp, p)
-                x = x - 1
-            x = x // 2
-            p = self.double(p)
+        Parameters:
+            p -- a point,
+            x -- a scalar (int),
+            glv -- use the endomorphism of SECP256k1 to split x
+                   into two halves (only for points on SECP256k1).
+        """
+        return self.multi_multiply([(p, x)], glv)
+
+
+    @staticmethod
+    def multi_multiply(terms, glv=True, method=None, tables=None):
+        """Return p1 * x1 + p2 * x2 + ... (multi-scalar multiplication)
+
+        Parameters:
+            terms -- a list with couples (point, scalar),
+            glv -- use the endomorphism of SECP256k1 to split scalars
+                   into two halves (only for points on SECP256k1),
+            method -- "strauss" (interleaved wNAF), "pippenger" (buckets)
+                      or None to choose by the number of terms,
+            tables -- a TableCache with precomputed tables for
+                      the points of SECP256k1 used many times.
+        All the terms share the same doublings, the generator point
+        of SECP256k1 uses the precomputed table.
+        """
+        terms = list(terms)
+        if not terms:
+            return ECPoint.infinity()
+
+        return _jacobian_to_affine(
+            _jacobian_multi_multiply(terms, glv, method, tables), terms[0][0]
+        )
+
+
+    @staticmethod
+    def multi_multiply_batch(jobs, glv=True):
+        """Return a list with the results of multi_multiply for each
+        list of terms in jobs (the points are on the same curve).
+
+        The results are converted to the affine form together
+        with one modular inversion (Montgomery's trick).
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        if not all(jobs):
+            raise ValueError("Empty list of terms in the batch")
 
-        return temp
+        return _jacobian_batch_to_affine(
+            [_jacobian_multi_multiply(terms, glv) for terms in jobs],
+            jobs[0][0][0]
+        )
+
+
+    @staticmethod
+    def iter_multiples(p, start, step=1, count=None, batch_size=256):
+        """Return a generator of couples (k, p * k) for
+        k = start, start + step, start + 2 * step, ...
+
+        Parameters:
+            p -- a point,
+            start -- the first scalar,
+            step -- the difference between the scalars,
+            count -- the number of multiples (None - infinite),
+            batch_size -- the number of points converted to the affine
+                          form together.
+        Each next multiple costs one point addition (+ p * step),
+        the points of a batch share one modular inversion.
+        """
+        curve = p.curve
+        a, mod = curve.a, curve.mod
+        # The next multiple in Jacobian coordinates and p * step in affine
+        current = _jacobian_multi_multiply([(p, start)], True)
+        p_step = p * step
+        k = start
+
+        while count is None or count > 0:
+            size = batch_size if count is None else min(batch_size, count)
+            scalars = []
+            points = []
+            for _ in range(size):
+                scalars.append(k)
+                points.append(current)
+                k += step
+                if not p_step.is_infinity():
+                    current = _jacobian_add_affine(current, p_step.x,
+                                                   p_step.y, a, mod)
+
+            yield from zip(scalars, _jacobian_batch_to_affine(points, p))
+            if count is not None:
+                count -= size
+
+
+    def multiply_binary(self, p, x):
+        """Return p * x with double-and-add (the reference algorithm)"""
+        if x < 0:
+            # p * (-x) = (-p) * x
+            p, x = ECPoint._make(p.x, -p.y % p.mod, p.curve), -x
+        if x == 0 or p.is_infinity():
+            return ECPoint.infinity()
+
+        # Double-and-add from the most significant bit in Jacobian
+        # coordinates, p is added in the affine form (mixed addition).
+        # The only inversion is in the conversion back to the affine form.
+        temp = (p.x, p.y, 1)
+        for bit in bin(x)[3:]:
+            temp = _jacobian_double(temp, p.a, p.mod)
+            if bit == "1":
+                temp = _jacobian_add_affine(temp, p.x, p.y, p.a, p.mod)
+
+        return _jacobian_to_affine(temp, p)
 
 
     @staticmethod
     def infinity():
         """Return the infinity point on the elliptic curve point"""
-        return ECPoint(0, 0)
+        return ECPOINT_INFINITY
+
+
+    def is_infinity(self):
+        """Return True if the point is the infinity"""
+        return not self.x and not self.y
+
+
+    def is_secp256k1(self):
+        """Return True if the point is on the elliptic curve SECP256k1"""
+        return self.curve is SECP256K1_CURVE
+
+
+    def is_secp256k1_generator(self):
+        """Return True if the point is the generator point of SECP256k1"""
+        return self.x == SECP256K1_GX and self.y == SECP256K1_GY and \
+            self.is_secp256k1()
+
+
+    @staticmethod
+    def split_secp256k1_scalar(x):
+        """Split a scalar x into x1, x2 (GLV decomposition).
+
+        x = x1 + x2 * lambda (mod order), x1 and x2 are signed
+        integers of about 128 bits.
+        """
+        n = SECP256K1_ORDER
+        x %= n
+        # c1 = round(b2 * x / n), c2 = round(-b1 * x / n)
+        c1 = (SECP256K1_GLV_B2 * x + n // 2) // n
+        c2 = (-SECP256K1_GLV_B1 * x + n // 2) // n
+        x1 = x - c1 * SECP256K1_GLV_A1 - c2 * SECP256K1_GLV_A2
+        x2 = -c1 * SECP256K1_GLV_B1 - c2 * SECP256K1_GLV_B2
+
+        return x1, x2
 
 
     @staticmethod
@@ -144,6 +381,31 @@ class ECPoint:
         return y
 
 
+    @classmethod
+    def from_secp256k1_x(cls, x, odd=False):
+        """Return the point of SECP256k1 with x and the parity of y.
+
+        Raise ValueError if there is no such point.
+        """
+        if not 0 <= x < SECP256K1_P:
+            raise ValueError("Invalid x coordinate: {:x}".format(x))
+        try:
+            y = cls.get_secp256k1_y(x)
+        except AssertionError:
+            raise ValueError("No point with x coordinate: {:x}".format(x))
+        # Choice odd or even y
+        if y % 2 != odd:
+            y = SECP256K1_P - y
+
+        return cls._make(x, y, SECP256K1_CURVE)
+
+
+    @staticmethod
+    def get_secp256k1_generator():
+        """Return the generator point of SECP256k1 (a shared object)"""
+        return SECP256K1_G_POINT
+
+
     @staticmethod
     def get_secp256k1_a():
         return SECP256K1_A
@@ -183,3 +445,514 @@ class ECPoint:
     def get_secp256k1_h():
         return SECP256K1_H
 
+
+
+class FixedBaseTable:
+    """Represents precomputed multiples of a fixed point for
+    the fast scalar multiplication (fixed-base windowed method).
+    """
+
+    def __init__(self, point: ECPoint, order=None, window=4):
+        """Construct a table for the point.
+
+        Parameters:
+            point -- a fixed (base) point,
+            order -- the order of the point, scalars are reduced modulo
+                     order (if None then scalars must be non-negative),
+            window -- a width (bits) of the signed windows.
+        Scalars of order.bit_length() bits are multiplied without
+        any doubling, the table has (bits // window + 2) rows
+        of 2^(window-1) affine points (the last row is for the carry
+        of the signed digits).
+        """
+        self.point = point
+        self.order = order
+        self.window = window
+        self.bits = order.bit_length() if order else SECP256K1_ORDER_LEN
+        self._rows = []
+
+        # row[i][j] = (j + 1) * 2^(window*i) * point
+        half = 1 << (window - 1)
+        base = (point.x, point.y, 1)
+        multiples = []
+        for _ in range(self.bits // window + 2):
+            multiples.append(base)
+            for _ in range(half - 1):
+                multiples.append(
+                    _jacobian_add(multiples[-1], base, point.a, point.mod)
+                )
+            for _ in range(window):
+                base = _jacobian_double(base, point.a, point.mod)
+
+        multiples = [(p.x, p.y)
+                     for p in _jacobian_batch_to_affine(multiples, point)]
+        for i in range(0, len(multiples), half):
+            self._rows.append(multiples[i : i + half])
+
+
+    def multiply(self, x):
+        """Return point * x"""
+        return _jacobian_to_affine(self.multiply_jacobian(x), self.point)
+
+
+    def multiply_jacobian(self, x):
+        """Return point * x in Jacobian coordinates"""
+        if self.order:
+            x %= self.order
+        if x < 0 or x.bit_length() > self.bits:
+            raise ValueError("Invalid scalar for the table: {:x}".format(x))
+
+        a, mod = self.point.a, self.point.mod
+        size = 1 << self.window
+        half = size >> 1
+        mask = size - 1
+        result = JACOBIAN_INFINITY
+
+        # Signed windows: a digit d in [-half, half] is added as
+        # d * 2^(window*i) * point, a negative digit uses -y
+        for row in self._rows:
+            if not x:
+                break
+            d = x & mask
+            x >>= self.window
+            if d > half:
+                d -= size
+                x += 1
+            if d > 0:
+                px, py = row[d - 1]
+                result = _jacobian_add_affine(result, px, py, a, mod)
+            elif d < 0:
+                px, py = row[-d - 1]
+                result = _jacobian_add_affine(result, px, mod - py, a, mod)
+
+        return result
+
+
+    @staticmethod
+    def get_secp256k1_generator_table():
+        """Return the table for the generator point of SECP256k1.
+
+        The table is built once (on the first call).
+        """
+        global _SECP256K1_G_TABLE
+        if _SECP256K1_G_TABLE is None:
+            _SECP256K1_G_TABLE = FixedBaseTable(SECP256K1_G_POINT,
+                                                SECP256K1_ORDER,
+                                                SECP256K1_G_WINDOW)
+        return _SECP256K1_G_TABLE
+
+
+class TableCache:
+    """Represents a bounded cache of precomputed tables (FixedBaseTable)
+    for the points of SECP256k1 which are multiplied many times
+    (ex. public keys in the verification).
+
+    A table for a point is built after threshold uses of the point,
+    the least recently used tables are removed above capacity.
+    The tables and counters are changed under a lock, so the cache may
+    be shared by threads (a table is built outside the lock).
+    """
+
+    def __init__(self, threshold=32, capacity=32, window=5):
+        """Construct an object.
+
+        Parameters:
+            threshold -- the number of uses of a point before
+                         building its table,
+            capacity -- the maximum number of tables,
+            window -- a width (bits) of the windows in the tables.
+        """
+        self.threshold = threshold
+        self.capacity = capacity
+        self.window = window
+        self._tables = OrderedDict()
+        # The numbers of uses for the points without tables
+        self._uses = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def __repr__(self):
+        return \
+            str({
+                "threshold": self.threshold,
+                "capacity": self.capacity,
+                "window": self.window,
+                "tables": len(self._tables)
+            })
+
+
+    def __len__(self):
+        return len(self._tables)
+
+
+    def get(self, point: ECPoint):
+        """Count a use of the point and return its table or None"""
+        key = (point.x, point.y)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                return table
+
+            uses = self._uses.pop(key, 0) + 1
+            if uses < self.threshold:
+                self._uses[key] = uses
+                # The counters are also bounded
+                if len(self._uses) > TABLE_CACHE_USES_FACTOR * self.capacity:
+                    self._uses.popitem(last=False)
+                return None
+
+        table = FixedBaseTable(point, SECP256K1_ORDER, self.window)
+        with self._lock:
+            # Another thread may have built the table meanwhile
+            table = self._tables.setdefault(key, table)
+            self._tables.move_to_end(key)
+            if len(self._tables) > self.capacity:
+                self._tables.popitem(last=False)
+
+        return table
+
+
+    def clear(self):
+        """Remove all the tables and counters"""
+        with self._lock:
+            self._tables.clear()
+            self._uses.clear()
+
+
+# The infinity point, the generator point of SECP256k1
+# and its precomputed table (lazy)
+ECPOINT_INFINITY = ECPoint(0, 0)
+SECP256K1_G_POINT = ECPoint(SECP256K1_GX, SECP256K1_GY)
+_SECP256K1_G_TABLE = None
+
+
+# Jacobian coordinates (X, Y, Z) represent the affine point
+# (X / Z^2, Y / Z^3), the infinity point has Z = 0. The arithmetic
+# in Jacobian coordinates has no modular inversions.
+JACOBIAN_INFINITY = (1, 1, 0)
+
+
+def _jacobian_double(p, a, mod):
+    """Return 2 * p for a point p in Jacobian coordinates"""
+    x, y, z = p
+    if not y or not z:
+        return JACOBIAN_INFINITY
+
+    yy = y * y % mod
+    s = 4 * x * yy % mod
+    # m = 3*x^2 + a*z^4
+    m = 3 * x * x
+    if a:
+        zz = z * z % mod
+        m += a * zz * zz
+    m %= mod
+
+    x3 = (m * m - 2 * s) % mod
+    y3 = (m * (s - x3) - 8 * yy * yy) % mod
+    z3 = 2 * y * z % mod
+
+    return x3, y3, z3
+
+
+def _jacobian_add(p1, p2, a, mod):
+    """Return p1 + p2 for two points in Jacobian coordinates"""
+    x1, y1, z1 = p1
+    x2, y2, z2 = p2
+    if not z1:
+        return p2
+    if not z2:
+        return p1
+
+    z1z1 = z1 * z1 % mod
+    z2z2 = z2 * z2 % mod
+    u1 = x1 * z2z2 % mod
+    u2 = x2 * z1z1 % mod
+    s1 = y1 * z2 * z2z2 % mod
+    s2 = y2 * z1 * z1z1 % mod
+
+    # Check if the points are on a vertical line
+    if u1 == u2:
+        return _jacobian_double(p1, a, mod) if s1 == s2 \
+            else JACOBIAN_INFINITY
+
+    h = (u2 - u1) % mod
+    r = (s2 - s1) % mod
+    hh = h * h % mod
+    hhh = h * hh % mod
+    v = u1 * hh % mod
+
+    x3 = (r * r - hhh - 2 * v) % mod
+    y3 = (r * (v - x3) - s1 * hhh) % mod
+    z3 = z1 * z2 * h % mod
+
+    return x3, y3, z3
+
+
+def _jacobian_add_affine(p1, x2, y2, a, mod):
+    """Return p1 + (x2, y2), p1 in Jacobian and (x2, y2) in affine
+    coordinates (mixed addition, z2 = 1).
+    """
+    x1, y1, z1 = p1
+    if not z1:
+        return x2, y2, 1
+
+    z1z1 = z1 * z1 % mod
+    u2 = x2 * z1z1 % mod
+    s2 = y2 * z1 * z1z1 % mod
+
+    # Check if the points are on a vertical line
+    if x1 == u2:
+        return _jacobian_double(p1, a, mod) if y1 == s2 \
+            else JACOBIAN_INFINITY
+
+    h = (u2 - x1) % mod
+    r = (s2 - y1) % mod
+    hh = h * h % mod
+    hhh = h * hh % mod
+    v = x1 * hh % mod
+
+    x3 = (r * r - hhh - 2 * v) % mod
+    y3 = (r * (v - x3) - y1 * hhh) % mod
+    z3 = z1 * h % mod
+
+    return x3, y3, z3
+
+
+def _jacobian_to_affine(p, curve_point):
+    """Convert a point in Jacobian coordinates to an ECPoint on the same
+    elliptic curve as curve_point.
+    """
+    x, y, z = p
+    if not z:
+        return ECPoint.infinity()
+
+    mod = curve_point.mod
+    z_inv = mod_inverse(z, mod)
+    z_inv2 = z_inv * z_inv % mod
+
+    return ECPoint._make(x * z_inv2 % mod, y * z_inv2 * z_inv % mod,
+                         curve_point.curve)
+
+
+def _jacobian_batch_to_affine(points, curve_point):
+    """Convert a list of points in Jacobian coordinates to ECPoints
+    on the same elliptic curve as curve_point with one modular inversion.
+    """
+    curve = curve_point.curve
+    mod = curve.mod
+    z_invs = iter(batch_mod_inverse([z for _, _, z in points if z], mod))
+
+    result = []
+    for x, y, z in points:
+        if not z:
+            result.append(ECPoint.infinity())
+            continue
+        z_inv = next(z_invs)
+        z_inv2 = z_inv * z_inv % mod
+        result.append(
+            ECPoint._make(x * z_inv2 % mod, y * z_inv2 * z_inv % mod, curve)
+        )
+
+    return result
+
+
+def _jacobian_multi_multiply(terms, glv, method=None, tables=None):
+    """Return p1 * x1 + p2 * x2 + ... for terms [(ECPoint, int), ...]
+    in Jacobian coordinates (see ECPoint.multi_multiply).
+    """
+    curve = terms[0][0].curve
+    a, mod = curve.a, curve.mod
+    if curve is not SECP256K1_CURVE:
+        tables = None
+    g_scalar = 0
+    table_terms = []
+    jacobian_terms = []
+    for p, x in terms:
+        if p.curve is not curve:
+            raise ValueError("The points are on different curves")
+        if p.is_infinity():
+            continue
+
+        if p.x == SECP256K1_GX and p.y == SECP256K1_GY and \
+                curve is SECP256K1_CURVE:
+            g_scalar += x
+            continue
+
+        table = tables.get(p) if tables is not None else None
+        if table is not None:
+            table_terms.append((table, x))
+        elif glv and curve is SECP256K1_CURVE:
+            # p * x = p * x1 + (lambda * p) * x2, x1 and x2 ~ 128 bits
+            x1, x2 = ECPoint.split_secp256k1_scalar(x)
+            jacobian_terms.append(((p.x, p.y, 1), x1))
+            jacobian_terms.append(((SECP256K1_BETA * p.x % mod, p.y, 1), x2))
+        else:
+            jacobian_terms.append(((p.x, p.y, 1), x))
+
+    if method is None:
+        method = "pippenger" \
+            if len(jacobian_terms) >= PIPPENGER_MIN_TERMS else "strauss"
+    if method == "strauss":
+        result = _jacobian_multiply_wnaf(jacobian_terms, a, mod, WNAF_WINDOW)
+    elif method == "pippenger":
+        result = _jacobian_multiply_pippenger(jacobian_terms, a, mod)
+    else:
+        raise ValueError("Invalid method: {}".format(method))
+
+    if g_scalar:
+        table_terms.append(
+            (FixedBaseTable.get_secp256k1_generator_table(), g_scalar)
+        )
+    for table, x in table_terms:
+        result = _jacobian_add(result, table.multiply_jacobian(x), a, mod)
+
+    return result
+
+
+def _wnaf(x, window):
+    """Return the width-w non-adjacent form of x >= 0.
+
+    The digits are odd integers in (-2^(w-1), 2^(w-1)) or zeros,
+    the least significant digit is the first.
+    """
+    size = 1 << window
+    half = size >> 1
+    mask = size - 1
+    digits = []
+
+    while x:
+        if x & 1:
+            d = x & mask
+            if d >= half:
+                d -= size
+            x -= d
+        else:
+            d = 0
+        digits.append(d)
+        x >>= 1
+
+    return digits
+
+
+def _jacobian_multiply_wnaf(terms, a, mod, window):
+    """Return the sum of p * x for terms [(p, x), ...] with interleaved
+    wNAF (Strauss), the points p are in Jacobian coordinates.
+
+    All the terms share the same doublings.
+    """
+    prepared = []
+    for p, x in terms:
+        if x < 0:
+            # p * (-x) = (-p) * x
+            p, x = (p[0], -p[1] % mod, p[2]), -x
+        if not x or not p[2]:
+            continue
+        digits = _wnaf(x, window)
+
+        # Odd multiples p, 3p, 5p, ... up to the largest digit
+        multiples = [p]
+        top = max(abs(d) for d in digits)
+        if top > 1:
+            twice = _jacobian_double(p, a, mod)
+            for _ in range(top // 2):
+                multiples.append(_jacobian_add(multiples[-1], twice, a, mod))
+
+        prepared.append((digits, multiples))
+
+    result = JACOBIAN_INFINITY
+    for i in range(max((len(d) for d, _ in prepared), default=0) - 1, -1, -1):
+        result = _jacobian_double(result, a, mod)
+        for digits, multiples in prepared:
+            if i >= len(digits) or not digits[i]:
+                continue
+            d = digits[i]
+            if d > 0:
+                result = _jacobian_add(result, multiples[d >> 1], a, mod)
+            else:
+                x, y, z = multiples[-d >> 1]
+                result = _jacobian_add(result, (x, mod - y, z), a, mod)
+
+    return result
+
+
+def _pippenger_window(count, bits):
+    """Return the window width (bits) for the bucket method with
+    count terms of bits-bit scalars.
+
+    The cost is about bits / window * (count + 2^window) additions.
+    """
+    return min(range(1, 21),
+               key=lambda w: -(-bits // w) * (count + (1 << w)))
+
+
+def _jacobian_multiply_pippenger(terms, a, mod, window=None):
+    """Return the sum of p * x for terms [(p, x), ...] with the bucket
+    method (Pippenger), the points p are in Jacobian coordinates.
+
+    For each signed window digit d the points are collected in the bucket
+    |d| (the point is negated for d < 0), and the buckets are summed as
+    1 * B1 + 2 * B2 + ... with running sums.
+    """
+    points = []
+    scalars = []
+    for p, x in terms:
+        if not x or not p[2]:
+            continue
+        if x < 0:
+            # p * (-x) = (-p) * x
+            p, x = (p[0], -p[1] % mod, p[2]), -x
+        if p[2] != 1:
+            # The buckets use mixed additions with affine points
+            z_inv = mod_inverse(p[2], mod)
+            p = (p[0] * z_inv * z_inv % mod, p[1] * z_inv ** 3 % mod, 1)
+        points.append((p[0], p[1]))
+        scalars.append(x)
+    if not points:
+        return JACOBIAN_INFINITY
+
+    bits = max(scalars).bit_length()
+    window = _pippenger_window(len(points), bits) if window is None \
+        else window
+    size = 1 << window
+    half = size >> 1
+    mask = size - 1
+
+    # Signed digits of the scalars, the least significant first
+    digits = []
+    for x in scalars:
+        d_list = []
+        while x:
+            d = x & mask
+            x >>= window
+            if d > half:
+                d -= size
+                x += 1
+            d_list.append(d)
+        digits.append(d_list)
+
+    result = JACOBIAN_INFINITY
+    for i in range(max(len(d) for d in digits) - 1, -1, -1):
+        for _ in range(window):
+            result = _jacobian_double(result, a, mod)
+
+        buckets = [JACOBIAN_INFINITY] * (half + 1)
+        for (px, py), d_list in zip(points, digits):
+            if i >= len(d_list) or not d_list[i]:
+                continue
+            d = d_list[i]
+            if d > 0:
+                buckets[d] = _jacobian_add_affine(buckets[d], px, py, a, mod)
+            else:
+                buckets[-d] = _jacobian_add_affine(buckets[-d], px, mod - py,
+                                                   a, mod)
+
+        # total = sum(j * buckets[j]) = sum of the running sums
+        running = JACOBIAN_INFINITY
+        total = JACOBIAN_INFINITY
+        for j in range(half, 0, -1):
+            running = _jacobian_add(running, buckets[j], a, mod)
+            total = _jacobian_add(total, running, a, mod)
+        result = _jacobian_add(result, total, a, mod)
+
+    return result
@@ -1,7 +1,10 @@
-from btc.utils import sha256, ripemd160, base58_encode, base58_decode, \
-    mod_inverse, int2bytes, bytes2int
-from btc.randoms import random_bbs, random_rfc6979
-from btc.ecpoint import ECPoint
+from secrets import randbelow
+
+from btc.utils import sha256, ripemd160, mod_inverse, int2bytes, bytes2int
+from btc.base58 import encode_check, decode_check
+from btc.randoms import random_rfc6979, get_default_drbg
+from btc.ecpoint import ECPoint, TableCache
+from btc.sigcache import SignatureCache
 
 
 ADDRESS_PREFIX_MAINNET = 0x00
@@ -14,14 +17,23 @@ class KeysBTC:
      Getting keys and addresses, transforming formats, signing and verifying.
      """
 
-    def __init__(self, private_key=None):
-        """Construct an object with a private key (bytes or str)"""
+    # Precomputed tables for the public keys verified many times
+    # (None - do not use the tables)
+    verify_tables = TableCache()
+    # The cache of the verified signatures (None - do not use the cache)
+    signature_cache = SignatureCache()
+
+    def __init__(self, private_key=None, random_source=None):
+        """Construct an object with a private key (bytes or str).
+
+        If private_key is None then get a random key from random_source
+        (an object with randbelow(n), ex. HmacDrbg; None - the shared
+        HMAC-DRBG seeded from os.urandom).
+        """
 
-        # Init private_key, if input is None then get a random BBS
+        # Init private_key, if input is None then get a random key
         if private_key is None:
-            self._private_key = int2bytes(
-                random_bbs(ECPoint.get_secp256k1_order_len())
-            )
+            self._private_key = KeysBTC.random_private_key(random_source)
         else:
             self._private_key = bytes.fromhex(private_key) \
                 if isinstance(private_key, str) else private_key
@@ -112,20 +124,8 @@ class KeysBTC:
         version = ADDRESS_PREFIX_MAINNET if version is None else version
 
         if self._address is None:
-            # Set an address version (mainnet or testnet)
-            t = bytes([version]) + self.get_pubkey_hash()
-            # Add checksum
-            t += sha256(sha256(t))[0:4]
-            # Count leading zeros
-            leading_zeros = 0
-            for _ in t:
-                if _ == 0:
-                    leading_zeros += 1
-                else:
-                    break
-            # Change leading zeros by ones and encode to base58
-            self._address = leading_zeros * "1" + \
-                            base58_encode(t)
+            self._address = \
+                self.pubkey_hash_to_address(self.get_pubkey_hash(), version)
 
         return self._address
 
@@ -133,8 +133,7 @@ class KeysBTC:
     @staticmethod
     def get_generator_point():
         """Return Generator Point for SECP256k1"""
-        return ECPoint(ECPoint.get_secp256k1_gx(),
-                       ECPoint.get_secp256k1_gy())
+        return ECPoint.get_secp256k1_generator()
 
 
     @staticmethod
@@ -142,9 +141,8 @@ class KeysBTC:
         """Convert a private key to WIF (str)"""
         compressed_flag = b"\x01" if compressed else b""
         wif = b"\x80" + private_key + compressed_flag
-        double_sha = sha256(sha256(wif))
         try:
-            return base58_encode(wif + double_sha[:4])
+            return encode_check(wif)
         except Exception:
             raise ValueError(
                 "Invalid private key: {:s}".format(private_key.hex())
@@ -155,7 +153,9 @@ class KeysBTC:
     def privatekey_from_wif(wif: str):
         """Convert private key WIF to an integer"""
         try:
-            p = base58_decode(wif, 38)
+            p = decode_check(wif)
+            # The prefix 80, the private key and 01 if compressed
+            assert p[0] == 0x80 and len(p) in [33, 34]
             return p[1:33]
         except Exception:
             raise ValueError(
@@ -173,6 +173,36 @@ class KeysBTC:
             return b"\x04" + int2bytes(point.x) + int2bytes(point.y)
 
 
+    @staticmethod
+    def publickey_to_point(public_key: bytes):
+        """Convert a public key (compressed or uncompressed) to a point"""
+        if len(public_key) == 33 and public_key[0] in [2, 3]:
+            # Calculate y coordinate by x and choice even y if prefix = 02,
+            # else choice odd y
+            return ECPoint.from_secp256k1_x(bytes2int(public_key[1:]),
+                                            public_key[0] == 3)
+        elif len(public_key) == 65 and public_key[0] == 4:
+            try:
+                return ECPoint(bytes2int(public_key[1:33]),
+                               bytes2int(public_key[33:]))
+            except AssertionError:
+                pass
+        raise ValueError(
+            "Invalid public key: {:s}".format(public_key.hex())
+        )
+
+
+    @staticmethod
+    def pubkey_hash_to_address(pubkey_hash: bytes, version: int=None):
+        """Convert a public key hash to a btc-address"""
+        # If None then version is a mainnet address
+        version = ADDRESS_PREFIX_MAINNET if version is None else version
+
+        # Set an address version (mainnet or testnet) and encode
+        # with the checksum (leading zeros are encoded to ones)
+        return encode_check(bytes([version]) + pubkey_hash)
+
+
     @staticmethod
     def address_to_pubkey_hash(address: str):
         """Check an address checksum.
@@ -181,9 +211,12 @@ class KeysBTC:
         else raise ValueError.
         """
         # calculate the public key hash
-        t = base58_decode(address.lstrip("1"), 25)
+        try:
+            t = decode_check(address)
+        except ValueError:
+            t = None
         # If the checksum is correct
-        if sha256(sha256(t[:21]))[:4] == t[21:]:
+        if t is not None and len(t) == 21:
             return t[1:21]
         else:
             raise ValueError(
@@ -191,6 +224,66 @@ class KeysBTC:
             )
 
 
+    @staticmethod
+    def random_private_key(random_source=None):
+        """Return a random private key (bytes) in [1, N).
+
+        Parameters:
+            random_source -- an object with randbelow(n), ex. HmacDrbg
+                             (None - the shared HMAC-DRBG).
+        """
+        if random_source is None:
+            random_source = get_default_drbg()
+
+        return int2bytes(
+            1 + random_source.randbelow(ECPoint.get_secp256k1_order() - 1)
+        )
+
+
+    @staticmethod
+    def key_range(start=None, count=None, step=1, compressed=True,
+                  version=None, batch_size=256, random_source=None):
+        """Return a generator of keys for the private keys
+        start, start + step, start + 2 * step, ... (mod N)
+
+        Parameters:
+            start -- the first private key (bytes, str or int,
+                     None - a random key from random_source),
+            count -- the number of keys (None - infinite),
+            step -- the difference between the private keys,
+            compressed -- the format of the public keys,
+            version -- the address version (None - mainnet),
+            batch_size -- the number of public points converted
+                          to the affine form together,
+            random_source -- a random source for start (see __init__).
+        Yield tuples (private_key, public_key, pubkey_hash, address),
+        each next public point costs one point addition. A private key
+        equal to 0 (mod N) is skipped.
+        """
+        N = ECPoint.get_secp256k1_order()
+        if start is None:
+            start = KeysBTC.random_private_key(random_source)
+        if isinstance(start, str):
+            start = bytes.fromhex(start)
+        if isinstance(start, bytes):
+            start = bytes2int(start)
+        if not 0 < start % N or not 0 < step % N:
+            raise ValueError("Invalid private key or step")
+
+        points = ECPoint.iter_multiples(KeysBTC.get_generator_point(),
+                                        start % N, step % N, count,
+                                        batch_size)
+        for k, point in points:
+            if point.is_infinity():
+                continue
+            public_key = KeysBTC.point_to_publickey(point, compressed)
+            pubkey_hash = ripemd160(sha256(public_key))
+            yield (int2bytes(k % N),
+                   public_key,
+                   pubkey_hash,
+                   KeysBTC.pubkey_hash_to_address(pubkey_hash, version))
+
+
     @staticmethod
     def get_addr_ver_main():
         return ADDRESS_PREFIX_MAINNET
@@ -201,34 +294,209 @@ class KeysBTC:
         return ADDRESS_PREFIX_TESTNET
 
 
-    def sign(self, hash: bytes):
-        """Sign a hash with the object's keys"""
+    def sign(self, hash: bytes, recoverable=False):
+        """Sign a hash with the object's keys.
+
+        Return r, s (bytes) or r, s, recovery_id if recoverable is True,
+        recovery_id -- the parity of y of the point R = G * k
+        (+2 if R.x >= N).
+        """
         private_key_int = self.get_private_key_int()
         N = ECPoint.get_secp256k1_order()
         h = bytes2int(hash) % N
         h = 1 if h == 0 else h
 
         # get the deterministic random integer with RFC 6979
-        k = random_rfc6979(hash, private_key_int, N,
-                           self.get_generator_point())
-        # Calculate G * k
-        C = self.get_generator_point() * k
-        s = ((h + C.x * private_key_int) * mod_inverse(k, N)) % N
+        # and C = G * k (computed once to check k)
+        k, C = random_rfc6979(hash, private_key_int, N,
+                              self.get_generator_point(), return_point=True)
+        r = C.x % N
+        s = ((h + r * private_key_int) * mod_inverse(k, N)) % N
 
         # Return r and s
-        return int2bytes(C.x), int2bytes(s)
+        if recoverable:
+            return int2bytes(r), int2bytes(s), C.y % 2 + 2 * (C.x >= N)
+        return int2bytes(r), int2bytes(s)
+
+
+    @staticmethod
+    def recover_public_key(hash: bytes, r: bytes, s: bytes, recovery_id: int):
+        """Return the public point for a sign r, s of a hash.
+
+        recovery_id -- the parity of y of the point R (+2 if R.x = r + N).
+        Q = (R * s - G * h) / r
+        """
+        N = ECPoint.get_secp256k1_order()
+        h = bytes2int(hash) % N
+        h = 1 if h == 0 else h
+
+        r1 = bytes2int(r)
+        s1 = bytes2int(s)
+        if not (0 < r1 < N and 0 < s1 < N) or not 0 <= recovery_id <= 3:
+            raise ValueError("Invalid signature or recovery id")
+
+        # Lift r to the point R
+        R = ECPoint.from_secp256k1_x(r1 + N if recovery_id & 2 else r1,
+                                     recovery_id & 1)
+        r_inv = mod_inverse(r1, N)
+        Q = ECPoint.multi_multiply(
+            [(R, s1 * r_inv % N),
+             (KeysBTC.get_generator_point(), -h * r_inv % N)]
+        )
+        if Q.is_infinity():
+            raise ValueError("Cannot recover the public key")
+
+        return Q
 
 
     def verify(self, hash: bytes, r: bytes, s: bytes):
         """Verify a sign r, s for a hash with the object's keys"""
+        return self.verify_point(hash, r, s, self.get_public_point())
+
+
+    @staticmethod
+    def verify_point(hash: bytes, r: bytes, s: bytes, public_point: ECPoint):
+        """Verify a sign r, s for a hash with a public point.
+
+        The valid signatures are kept in KeysBTC.signature_cache.
+        """
+        cache = KeysBTC.signature_cache
+        if cache is not None:
+            public_key = KeysBTC.point_to_publickey(public_point)
+            if cache.contains(hash, r, s, public_key):
+                return True
+
         N = ECPoint.get_secp256k1_order()
         h = bytes2int(hash) % N
         h = 1 if h == 0 else h
 
         r1 = bytes2int(r)
-        s_inv = mod_inverse(bytes2int(s), N)
+        s1 = bytes2int(s)
+        if not (0 < r1 < N and 0 < s1 < N):
+            return False
+
+        s_inv = mod_inverse(s1, N)
         u1 = (h * s_inv) % N
         u2 = (r1 * s_inv) % N
-        C = self.get_generator_point() * u1 + self.get_public_point() * u2
+        # Calculate G * u1 + Q * u2 with the shared doublings
+        C = ECPoint.multi_multiply([(KeysBTC.get_generator_point(), u1),
+                                    (public_point, u2)],
+                                   tables=KeysBTC.verify_tables)
+
+        if C.is_infinity() or C.x % N != r1:
+            return False
+
+        if cache is not None:
+            cache.add(hash, r, s, public_key)
+        return True
 
-        return C.x == r1
+
+    @staticmethod
+    def verify_batch(signatures):
+        """Verify a list of signatures.
+
+        Parameters:
+            signatures -- a list with tuples
+                          (hash, r, s, public_key) or
+                          (hash, r, s, public_key, recovery_id),
+                          public_key -- bytes or an ECPoint,
+                          recovery_id -- the parity of y of the point R
+                          (+2 if R.x = r + N).
+        Return -- a list with True/False for each signature.
+
+        The signatures with a recovery id are checked together with
+        a random linear combination:
+            sum(a_i * (G * u1_i + Q_i * u2_i - R_i)) = infinity,
+        if the check fails the list is split in halves (bisection)
+        to find the invalid signatures. The signatures without
+        a recovery id (ex. from sign(hash)) are verified one by one,
+        because R is known only up to the sign of y: use
+        sign(hash, recoverable=True) to verify in bulk faster.
+        The signatures in KeysBTC.signature_cache are not checked again.
+        """
+        N = ECPoint.get_secp256k1_order()
+        cache = KeysBTC.signature_cache
+        results = [False] * len(signatures)
+        # The list of tuples (i, u1, u2, Q, R) for the batch check
+        batch = []
+
+        for i, signature in enumerate(signatures):
+            hash, r, s, public_key = signature[:4]
+            recovery_id = signature[4] if len(signature) > 4 else None
+            try:
+                Q = public_key if isinstance(public_key, ECPoint) \
+                    else KeysBTC.publickey_to_point(public_key)
+            except ValueError:
+                continue
+
+            h = bytes2int(hash) % N
+            h = 1 if h == 0 else h
+            r1 = bytes2int(r)
+            s1 = bytes2int(s)
+            if not (0 < r1 < N and 0 < s1 < N):
+                continue
+
+            if recovery_id is None:
+                results[i] = KeysBTC.verify_point(hash, r, s, Q)
+                continue
+            if cache is not None and \
+                    cache.contains(hash, r, s, KeysBTC.point_to_publickey(Q)):
+                results[i] = True
+                continue
+
+            try:
+                R = ECPoint.from_secp256k1_x(
+                    r1 + N if recovery_id & 2 else r1, recovery_id & 1
+                )
+            except ValueError:
+                # A wrong recovery id, check the signature alone
+                results[i] = KeysBTC.verify_point(hash, r, s, Q)
+                continue
+
+            s_inv = mod_inverse(s1, N)
+            batch.append((i, h * s_inv % N, r1 * s_inv % N, Q, R))
+
+        KeysBTC._verify_bisect(batch, signatures, results)
+
+        return results
+
+
+    @staticmethod
+    def _verify_bisect(batch, signatures, results):
+        """Check the batch with the random linear combination,
+        split it in halves if the check fails.
+        """
+        if not batch:
+            return
+        if len(batch) == 1:
+            i = batch[0][0]
+            hash, r, s = signatures[i][:3]
+            results[i] = KeysBTC.verify_point(hash, r, s, batch[0][3])
+            return
+
+        N = ECPoint.get_secp256k1_order()
+        g_scalar = 0
+        # Terms with the same public point are combined
+        q_scalars = {}
+        terms = []
+        for n, (i, u1, u2, Q, R) in enumerate(batch):
+            # The random coefficient a_i (1 for the first signature)
+            a = 1 + randbelow(2 ** 128 - 1) if n else 1
+            g_scalar += a * u1
+            q_scalars[Q] = (q_scalars.get(Q, 0) + a * u2) % N
+            terms.append((R, N - a))
+
+        terms.append((KeysBTC.get_generator_point(), g_scalar % N))
+        terms.extend(q_scalars.items())
+
+        if ECPoint.multi_multiply(terms).is_infinity():
+            cache = KeysBTC.signature_cache
+            for i, u1, u2, Q, R in batch:
+                results[i] = True
+                if cache is not None:
+                    hash, r, s = signatures[i][:3]
+                    cache.add(hash, r, s, KeysBTC.point_to_publickey(Q))
+        else:
+            middle = len(batch) // 2
+            KeysBTC._verify_bisect(batch[:middle], signatures, results)
+            KeysBTC._verify_bisect(batch[middle:], signatures, results)
@@ -0,0 +1,272 @@
+import mmap
+import os
+import struct
+
+from btc.utils import sha256, ripemd160
+
+
+# The header: magic, format version, flags, record size
+KEY_STORE_MAGIC = b"BTCKEYS"
+KEY_STORE_VERSION = 1
+_HEADER = struct.Struct("<7sBBxxxI")
+KEY_STORE_HEADER_SIZE = _HEADER.size
+# The flag of the records with the chain codes
+KEY_STORE_CHAIN_CODE = 0x01
+# A record: index (4 bytes), public key (33), HASH160 (20) [, chain code (32)]
+_RECORD = struct.Struct("<I33s20s")
+_RECORD_CHAIN_CODE = struct.Struct("<I33s20s32s")
+PUBLIC_KEY_OFFSET = 4
+HASH160_OFFSET = PUBLIC_KEY_OFFSET + 33
+CHAIN_CODE_OFFSET = HASH160_OFFSET + 20
+
+
+def _read_header(f, file_name: str):
+    """Return the flags and the record size from the header of a file"""
+    header = f.read(KEY_STORE_HEADER_SIZE)
+    if len(header) != KEY_STORE_HEADER_SIZE:
+        raise ValueError("Invalid key store file: {:s}".format(file_name))
+    magic, version, flags, record_size = _HEADER.unpack(header)
+    if magic != KEY_STORE_MAGIC or version != KEY_STORE_VERSION:
+        raise ValueError("Invalid key store file: {:s}".format(file_name))
+
+    return flags, record_size
+
+
+class KeyStoreWriter:
+    """Represents a writer of a key store file: fixed-width records
+    (index, compressed public key, HASH160 [, chain code]) appended
+    by batches (ex. from a derivation pipeline).
+    """
+
+    def __init__(self, file_name: str, chain_codes=False):
+        """Construct an object, create the file or open it to append
+        (a partial record at the end, ex. after a crash, is removed).
+
+        Parameters:
+            file_name -- the name of the file,
+            chain_codes -- keep the chain codes in the records
+                           (must be the same for an existing file).
+        """
+        self.file_name = file_name
+        self.chain_codes = chain_codes
+        self._record = _RECORD_CHAIN_CODE if chain_codes else _RECORD
+
+        if os.path.exists(file_name) and os.path.getsize(file_name):
+            with open(file_name, "rb") as f:
+                flags, record_size = _read_header(f, file_name)
+            if bool(flags & KEY_STORE_CHAIN_CODE) != chain_codes or \
+                    record_size != self._record.size:
+                raise ValueError(
+                    "Other record format in the file: {:s}".format(file_name)
+                )
+            size = os.path.getsize(file_name) - KEY_STORE_HEADER_SIZE
+            os.truncate(file_name, KEY_STORE_HEADER_SIZE +
+                        size - size % record_size)
+            self._file = open(file_name, "ab")
+        else:
+            self._file = open(file_name, "wb")
+            self._file.write(_HEADER.pack(
+                KEY_STORE_MAGIC, KEY_STORE_VERSION,
+                KEY_STORE_CHAIN_CODE if chain_codes else 0,
+                self._record.size
+            ))
+
+
+    def __repr__(self):
+        return \
+            str({
+                "file_name": self.file_name,
+                "chain_codes": self.chain_codes,
+                "record_size": self._record.size
+            })
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def append_batch(self, records):
+        """Append the records (index, public_key, pubkey_hash) or
+        (index, public_key, pubkey_hash, chain_code) with one write.
+
+        Return the number of the records.
+        """
+        pack = self._record.pack
+        try:
+            if self.chain_codes:
+                data = [pack(*record[:4]) for record in records]
+            else:
+                data = [pack(*record[:3]) for record in records]
+        except struct.error as err:
+            raise ValueError("Invalid record: {:s}".format(str(err))) \
+                from None
+        self._file.write(b"".join(data))
+
+        return len(data)
+
+
+    def append_children(self, children):
+        """Append the extended keys (ex. from BIP32.iter_pub_children).
+
+        Return the number of the records.
+        """
+        return self.append_batch(
+            (child.index, child.get_public_key(),
+             ripemd160(sha256(child.get_public_key())), child.chain_code)
+            for child in children
+        )
+
+
+    def flush(self):
+        """Write the appended records to the file"""
+        self._file.flush()
+
+
+    def close(self):
+        """Close the file"""
+        self._file.close()
+
+
+class KeyStore:
+    """Represents a key store file opened with mmap (read only).
+
+    A record is a tuple (index, public_key, pubkey_hash, chain_code),
+    index is an int and the others are memoryviews of the mapped file
+    (no copies, chain_code is None if the file has no chain codes).
+    The pages are shared by all the processes which open the file,
+    opening costs only the header. The views must be released before
+    close; refresh keeps the old views valid.
+    """
+
+    def __init__(self, file_name: str):
+        """Construct an object, map the file.
+
+        Parameters:
+            file_name -- the name of the file (see KeyStoreWriter).
+        Raise ValueError if the header is invalid.
+        """
+        self.file_name = file_name
+        with open(file_name, "rb") as f:
+            flags, self.record_size = _read_header(f, file_name)
+        self.chain_codes = bool(flags & KEY_STORE_CHAIN_CODE)
+        record = _RECORD_CHAIN_CODE if self.chain_codes else _RECORD
+        if self.record_size != record.size:
+            raise ValueError(
+                "Invalid record size in the file: {:s}".format(file_name)
+            )
+        self._mmap = None
+        self._view = None
+        self._count = 0
+        self.refresh()
+
+
+    def __repr__(self):
+        return \
+            str({
+                "file_name": self.file_name,
+                "records": self._count,
+                "chain_codes": self.chain_codes
+            })
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def __len__(self):
+        return self._count
+
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("Record index out of range")
+
+        return self._get_record(KEY_STORE_HEADER_SIZE + i * self.record_size)
+
+
+    def __iter__(self):
+        return self.iter_records()
+
+
+    def _get_record(self, offset: int):
+        """Return the record at offset of the file"""
+        view = self._view
+        return (int.from_bytes(view[offset : offset + PUBLIC_KEY_OFFSET],
+                               byteorder="little"),
+                view[offset + PUBLIC_KEY_OFFSET : offset + HASH160_OFFSET],
+                view[offset + HASH160_OFFSET : offset + CHAIN_CODE_OFFSET],
+                view[offset + CHAIN_CODE_OFFSET : offset + self.record_size]
+                    if self.chain_codes else None)
+
+
+    def iter_records(self, start=0, stop=None):
+        """Return a generator of the records [start, stop)"""
+        stop = self._count if stop is None else min(stop, self._count)
+        offset = KEY_STORE_HEADER_SIZE + start * self.record_size
+        for _ in range(start, stop):
+            yield self._get_record(offset)
+            offset += self.record_size
+
+
+    def iter_hashes(self):
+        """Return a generator of couples (index, pubkey_hash)"""
+        for index, public_key, pubkey_hash, chain_code in self.iter_records():
+            yield index, pubkey_hash
+
+
+    def refresh(self):
+        """Map the file again if a writer has appended records.
+
+        The new mapping replaces the old one, which is unmapped when
+        the views of its records are released.
+        Return the number of the records.
+        """
+        size = os.path.getsize(self.file_name)
+        count = (size - KEY_STORE_HEADER_SIZE) // self.record_size
+        if count == self._count and self._mmap is not None:
+            return count
+
+        with open(self.file_name, "rb") as f:
+            new_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        old_mmap, old_view = self._mmap, self._view
+        self._mmap, self._view = new_mmap, memoryview(new_mmap)
+        self._count = count
+
+        if old_view is not None:
+            old_view.release()
+        if old_mmap is not None:
+            try:
+                old_mmap.close()
+            except BufferError:
+                # The views of the old records are alive (closed by GC)
+                pass
+
+        return count
+
+
+    def close(self):
+        """Unmap the file.
+
+        Raise BufferError (the store stays open) if the views of
+        the records are alive.
+        """
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                self._view = memoryview(self._mmap)
+                raise
+            self._mmap = None
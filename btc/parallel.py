@@ -0,0 +1,174 @@
+import multiprocessing
+from collections import deque
+
+from btc.utils import sha256, ripemd160
+from btc.ecpoint import ECPoint
+from btc.keys import KeysBTC
+from btc.bip32 import ExtendedKey, BIP32
+
+
+# The number of indexes derived by a worker in one task
+DERIVATION_SHARD_SIZE = 1024
+# The number of tasks in flight per worker (ahead of the consumer)
+DERIVATION_TASKS_PER_PROCESS = 2
+
+
+class ParallelDerivation:
+    """Represents a multi-process derivation of child keys (BIP32).
+
+    The ranges of indexes are split into shards, every task ships only
+    the compact parent (key and chain code) to a worker, the workers
+    return compact children which are streamed back in order.
+    Only a few tasks per worker are in flight, so a slow consumer
+    does not pile up the results in memory.
+    """
+
+    def __init__(self, processes: int = None,
+                 shard_size=DERIVATION_SHARD_SIZE):
+        """Construct an object.
+
+        Parameters:
+            processes -- the number of workers (None - the number of CPUs),
+            shard_size -- the number of indexes in one task.
+        """
+        self.processes = processes or multiprocessing.cpu_count()
+        self.shard_size = shard_size
+
+
+    def __repr__(self):
+        return \
+            str({
+                "processes": self.processes,
+                "shard_size": self.shard_size
+            })
+
+
+    def iter_jobs(self, jobs, addresses=False, version=None):
+        """Return a generator of the derived children for many parents.
+
+        Parameters:
+            jobs -- an iterable of tuples (parent, start, count), where
+                    parent is an extended private or public key (the
+                    children are of the same kind), start is the first
+                    index and count is the number of indexes,
+            addresses -- yield the addresses instead of the keys,
+            version -- the address version (None - mainnet).
+        Yield couples (job, child) in the order of the jobs and indexes,
+        job is the number of the job, child is an ExtendedKey or a tuple
+        (index, public_key, pubkey_hash, address) if addresses is True.
+        Invalid child keys (probability < 2^-127) are skipped.
+        """
+        tasks = self._iter_tasks(jobs, addresses, version)
+        window = self.processes * DERIVATION_TASKS_PER_PROCESS
+
+        context = multiprocessing.get_context()
+        with context.Pool(self.processes) as pool:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.apply_async(_derive_shard, (task,)))
+                if len(pending) < window:
+                    continue
+                # Wait for the oldest task before the next one
+                yield from _iter_result(pending.popleft().get(), addresses)
+
+            while pending:
+                yield from _iter_result(pending.popleft().get(), addresses)
+
+
+    def iter_children(self, parent: ExtendedKey, start=0, count=1):
+        """Return a generator of the extended child keys with the indexes
+        start, start + 1, ..., start + count - 1 (see iter_jobs)
+        """
+        for _, child in self.iter_jobs([(parent, start, count)]):
+            yield child
+
+
+    def iter_addresses(self, parent: ExtendedKey, start=0, count=1,
+                       version=None):
+        """Return a generator of tuples (index, public_key, pubkey_hash,
+        address) for the child keys (see iter_jobs)
+        """
+        for _, child in self.iter_jobs([(parent, start, count)], True,
+                                       version):
+            yield child
+
+
+    def _iter_tasks(self, jobs, addresses, version):
+        """Return a generator of the tasks (shards) for the workers"""
+        for job, (parent, start, count) in enumerate(jobs):
+            if parent.is_private():
+                compact = (True, parent.key, parent.chain_code, parent.level)
+            elif parent.is_public():
+                compact = (False, parent.get_public_key(), parent.chain_code,
+                           parent.level)
+            else:
+                raise ValueError("Invalid extended key")
+
+            for shard in range(start, start + count, self.shard_size):
+                yield (job, compact, shard,
+                       min(start + count, shard + self.shard_size),
+                       addresses, version)
+
+
+def _iter_result(result, addresses):
+    """Return a generator of the couples (job, child) for the result
+    of a task (see iter_jobs)
+    """
+    job, level, fingerprint, children = result
+    if addresses:
+        for child in children:
+            yield job, child
+    else:
+        for child in children:
+            yield job, _child_to_key(child, level, fingerprint)
+
+
+def _child_to_key(child, level, fingerprint):
+    """Return an ExtendedKey for a compact child from a worker"""
+    if len(child) == 3:
+        index, key, chain_code = child
+    else:
+        index, x, y, chain_code = child
+        key = ECPoint(x, y)
+
+    return ExtendedKey(key, chain_code, level, index, fingerprint)
+
+
+def _derive_shard(task):
+    """Derive the children with the indexes [start, end) of a compact
+    parent, return a tuple (job, level, fingerprint, children)
+    """
+    job, (private, key, chain_code, level), start, end, addresses, \
+        version = task
+
+    if private:
+        parent = ExtendedKey(key, chain_code, level)
+        children = []
+        for index in range(start, end):
+            try:
+                children.append(BIP32.prv_to_child(parent, index))
+            except ValueError:
+                pass
+    else:
+        parent = ExtendedKey(KeysBTC.publickey_to_point(key), chain_code,
+                             level)
+        children = BIP32.iter_pub_children(parent, start, end - start)
+
+    compact = []
+    for child in children:
+        if addresses:
+            public_key = child.get_public_key()
+            pubkey_hash = ripemd160(sha256(public_key))
+            compact.append(
+                (child.index,
+                 public_key,
+                 pubkey_hash,
+                 KeysBTC.pubkey_hash_to_address(pubkey_hash, version))
+            )
+        elif private:
+            compact.append((child.index, child.key, child.chain_code))
+        else:
+            compact.append((child.index, child.key.x, child.key.y,
+                            child.chain_code))
+
+    return job, level + 1, parent.get_key_fingerprint(), compact
@@ -1,78 +1,193 @@
-from math import log2, gcd, ceil
+import os
+import threading
+from functools import lru_cache
+from math import gcd, ceil
 from random import randrange, randint
 
-from btc.utils import sha, hmac_sha
+from btc.utils import sha, HmacSha
 from btc.ecpoint import ECPoint
 
 
+# The maximum number of bytes for one request of HMAC-DRBG (2^19 bits)
+DRBG_MAX_REQUEST = 2 ** 16
+# The number of requests of HMAC-DRBG between automatic reseeds
+DRBG_RESEED_INTERVAL = 2 ** 20
+# The length of the entropy (bytes) from os.urandom for HMAC-DRBG
+DRBG_ENTROPY_LEN = 32
+
+
+def _small_primes(limit):
+    """Return a list of the primes < limit (sieve of Eratosthenes)"""
+    sieve = bytearray([1]) * limit
+    sieve[:2] = b"\x00\x00"
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i :: i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(limit) if sieve[i]]
+
+
+# The small primes for the sieve (prefilter of candidates)
+SMALL_PRIMES = _small_primes(2000)
+_SMALL_PRIMES_SET = frozenset(SMALL_PRIMES)
+_SMALL_PRIMES_PRODUCT = 1
+for _p in SMALL_PRIMES:
+    _SMALL_PRIMES_PRODUCT *= _p
+del _p
+# Miller-Rabin with these bases is deterministic for n < MR_DETERMINISTIC_MAX
+MR_DETERMINISTIC_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+MR_DETERMINISTIC_MAX = 3317044064679887385961981
+# The number of random rounds for larger n (error < 4^-rounds)
+MR_ROUNDS = 32
+# The number of candidates sieved at once in a prime search
+PRIME_SIEVE_SIZE = 1024
+
+
+def _miller_rabin(n, bases):
+    """Return False if a base is a witness that odd n > 3 is composite"""
+    # Calculate s,t => n-1 = 2**s * t, where t is odd
+    t = n - 1
+    s = (t & -t).bit_length() - 1
+    t >>= s
+
+    for a in bases:
+        x = pow(a, t, n)  # x = a**t mod n
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = pow(x, 2, n)  # x = x**2 mod n
+            if x == n - 1:
+                break
+        else:
+            return False
+
+    return True
+
+
 def is_prime(n, r=None):
     """Algorithm Miller-Rabin.
 
     Return True if n most probably is a prime number,
-    r - number of rounds, recommended value = O(log2(n)).
+    r - number of rounds with random bases. If r is None then
+    the test is deterministic for n < MR_DETERMINISTIC_MAX (fixed bases)
+    and has MR_ROUNDS random rounds for larger n.
+    The small primes are checked first (one gcd).
     """
+    if n < 2:
+        return False
+    if n in _SMALL_PRIMES_SET:
+        return True
+    if gcd(n, _SMALL_PRIMES_PRODUCT) != 1:
+        return False
+    # No factors < SMALL_PRIMES[-1]
+    if n < SMALL_PRIMES[-1] ** 2:
+        return True
 
-    def get_st(n):
-        # Calculate s,t => n-1 = 2**s * t, where t is odd
-        s, t = 0, n - 1
+    if r is None and n < MR_DETERMINISTIC_MAX:
+        bases = MR_DETERMINISTIC_BASES
+    else:
+        r = MR_ROUNDS if r is None else r
+        bases = (randint(2, n - 2) for _ in range(r))
 
-        while t % 2 == 0:
-            s += 1
-            t //= 2
+    return _miller_rabin(n, bases)
 
-        return s, t
 
-    # If r is None then use recommended value = log2(n)
-    r = ceil(log2(n)) if r is None else r
-    # If n is even then it is not a prime
-    if n <= 2 or n % 2 == 0:
-        return False
+@lru_cache(maxsize=None)
+def _get_step_inverses(step):
+    """Return a list of couples (p, step^-1 mod p) for the small primes p
+    (except the divisors of step)
+    """
+    return [(p, pow(step, -1, p)) for p in SMALL_PRIMES if step % p]
 
-    s, t = get_st(n)
-    for k in range(r):
-        a = randint(2, n - 2)
-        x = pow(a, t, n)  # x = a**t mod n
-        if x == 1 or x == n - 1:
-            continue
 
-        next_k = False
-        for _ in range(s - 1):
-            x = pow(x, 2, n)  # x = x**2 mod n
-            next_k = True if x == n - 1 else False
-            if x == 1 or x == n - 1:
-                break
-        if not next_k:
-            return False
+def next_prime(start, end=None, step=None):
+    """Return the first prime p >= start, p = start (mod step), p < end.
 
-    return True
+    Parameters:
+        start -- the first candidate,
+        end -- the bound of the search (None - no bound),
+        step -- the step between candidates (None - any prime >= start).
+    The candidates are sieved by the small primes PRIME_SIEVE_SIZE
+    at once, only the rest are checked with Miller-Rabin.
+    Return None if there is no such prime < end.
+    """
+    if step is None:
+        if start <= 2:
+            return 2 if end is None or end > 2 else None
+        # The odd candidates
+        start |= 1
+        step = 2
+    if gcd(start, step) != 1:
+        # All the candidates after start have a common factor
+        return start if is_prime(start) and (end is None or start < end) \
+            else None
+    # The small candidates directly
+    while start <= SMALL_PRIMES[-1] and (end is None or start < end):
+        if start in _SMALL_PRIMES_SET:
+            return start
+        start += step
+
+    while end is None or start < end:
+        size = PRIME_SIEVE_SIZE if end is None else \
+            min(PRIME_SIEVE_SIZE, -(-(end - start) // step))
+        sieve = bytearray([1]) * size
+        for p, step_inverse in _get_step_inverses(step):
+            # The first i: start + step * i = 0 (mod p)
+            i = -start * step_inverse % p
+            if i < size:
+                sieve[i :: p] = bytes(len(range(i, size, p)))
+
+        for i in range(size):
+            if sieve[i] and is_prime(start + step * i):
+                return start + step * i
+        start += step * size
+
+    return None
 
 
 def random_prime(min, max, attempts=10000):
-    """Generate a random prime in [min, max)"""
+    """Generate a random odd prime in [min, max).
+
+    Search the next prime from a random start (wrapping to min).
+    """
     # Try to get a prime <attepmts> times
     for _ in range(attempts):
-        p = randrange(min, max)
-        if is_prime(p):
+        start = randrange(min, max) | 1
+        p = next_prime(start, max, 2) or next_prime(min | 1, start, 2)
+        if p is not None and p >= min:
             return p
     raise ValueError("Could not generate a prime number")
 
 
+def random_blum_prime(min, max, attempts=10000):
+    """Generate a random Blum prime (p = 3 mod 4) in [min, max).
+
+    Search the next prime from a random start = 3 (mod 4) with step 4.
+    """
+    for _ in range(attempts):
+        start = randrange(min, max) | 3
+        first = min + (3 - min) % 4
+        p = next_prime(start, max, 4) or next_prime(first, start, 4)
+        if p is not None and p >= min:
+            return p
+    raise ValueError("Could not generate a Blum prime number")
+
+
 def random_bbs(bit_length=256, min_prime=2 ** 64, max_prime=2 ** 128):
     """Algorithm Blum-Blum-Shub.
 
     Generate a random number of bit_length bits.
     """
-    # Get two large primes p,q = (3 mod 4)
+    # Get two different large primes p,q = (3 mod 4)
+    p = random_blum_prime(min_prime, max_prime)
     while True:
-        p = random_prime(min_prime, max_prime)
-        q = random_prime(min_prime, max_prime)
-        if p % 4 == 3 and q % 4 == 3:
+        q = random_blum_prime(min_prime, max_prime)
+        if q != p:
             break
     m = p * q
 
     # Get x which is relatively prime with m
     while True:
-        x = random_prime(min_prime, max_prime)
+        x = randrange(2, m)
         if gcd(m, x) == 1:
             break
 
@@ -86,8 +201,141 @@ def random_bbs(bit_length=256, min_prime=2 ** 64, max_prime=2 ** 128):
     return num
 
 
+class HmacDrbg:
+    """Represents a deterministic random bit generator HMAC-DRBG
+    (NIST SP 800-90A) - a persistent stream of random bytes.
+
+    The generator is seeded once (from os.urandom if no seed) and then
+    every request costs a few HMACs, so mass key creation does not pay
+    for the seeding. The generator is reseeded from os.urandom
+    explicitly (reseed), every DRBG_RESEED_INTERVAL requests and after
+    a fork (a child process does not repeat the parent's stream).
+    The state is locked in generate and reseed, so the threads sharing
+    a generator never get the same output.
+    """
+
+    def __init__(self, seed: bytes = None, nonce: bytes = b"",
+                 personalization: bytes = b"", sha_type="256",
+                 reseed_interval=DRBG_RESEED_INTERVAL):
+        """Construct an object.
+
+        Parameters:
+            seed -- the entropy input (None - from os.urandom),
+                    the same seed gives the same stream,
+            nonce -- a nonce for the seed,
+            personalization -- a personalization string,
+            sha_type -- type of hashing for HMAC,
+            reseed_interval -- the number of requests between reseeds
+                               from os.urandom (None - only explicit).
+        """
+        if seed is None:
+            seed = os.urandom(DRBG_ENTROPY_LEN)
+            nonce = nonce or os.urandom(DRBG_ENTROPY_LEN // 2)
+
+        self.sha_type = sha_type
+        self.reseed_interval = reseed_interval
+        self._lock = threading.RLock()
+        hlen = len(sha(b"", sha_type))
+        self._k = b"\x00" * hlen
+        self._v = b"\x01" * hlen
+        self._hmac = HmacSha(self._k, sha_type)
+        self._update(seed + nonce + personalization)
+        self._counter = 1
+        self._pid = os.getpid()
+
+
+    def __repr__(self):
+        return \
+            str({
+                "sha_type": self.sha_type,
+                "reseed_counter": self._counter,
+                "reseed_interval": self.reseed_interval
+            })
+
+
+    def _update(self, provided: bytes = b""):
+        """Update the state (K, V) with provided data"""
+        self._k = self._hmac.digest(self._v + b"\x00" + provided)
+        self._hmac = HmacSha(self._k, self.sha_type)
+        self._v = self._hmac.digest(self._v)
+        if provided:
+            self._k = self._hmac.digest(self._v + b"\x01" + provided)
+            self._hmac = HmacSha(self._k, self.sha_type)
+            self._v = self._hmac.digest(self._v)
+
+
+    def reseed(self, entropy: bytes = None, additional: bytes = b""):
+        """Reseed the generator with entropy (None - from os.urandom)"""
+        if entropy is None:
+            entropy = os.urandom(DRBG_ENTROPY_LEN)
+        with self._lock:
+            self._update(entropy + additional)
+            self._counter = 1
+            self._pid = os.getpid()
+
+
+    def generate(self, length: int, additional: bytes = b""):
+        """Return length random bytes.
+
+        A long request is split into requests of DRBG_MAX_REQUEST bytes.
+        """
+        with self._lock:
+            if self._pid != os.getpid() or (
+                    self.reseed_interval is not None and
+                    self._counter > self.reseed_interval):
+                self.reseed()
+
+            chunks = []
+            while True:
+                if additional:
+                    self._update(additional)
+                size = min(length, DRBG_MAX_REQUEST)
+                t = []
+                generated = 0
+                while generated < size:
+                    self._v = self._hmac.digest(self._v)
+                    t.append(self._v)
+                    generated += len(self._v)
+                chunks.append(b"".join(t)[:size])
+                self._update(additional)
+                self._counter += 1
+
+                length -= size
+                if length <= 0:
+                    break
+
+        return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+
+    def randbelow(self, n: int):
+        """Return a random integer in [0, n)"""
+        if n <= 0:
+            raise ValueError("The upper bound must be positive")
+        bits = n.bit_length()
+        while True:
+            num = int.from_bytes(self.generate((bits + 7) // 8),
+                                 byteorder="big") >> (-bits % 8)
+            if num < n:
+                return num
+
+
+_DEFAULT_DRBG = None
+_DEFAULT_DRBG_LOCK = threading.Lock()
+
+
+def get_default_drbg():
+    """Return the shared HMAC-DRBG seeded from os.urandom"""
+    global _DEFAULT_DRBG
+    with _DEFAULT_DRBG_LOCK:
+        if _DEFAULT_DRBG is None:
+            _DEFAULT_DRBG = HmacDrbg()
+
+    return _DEFAULT_DRBG
+
+
 def random_rfc6979(message: bytes, x: int, q: int,
-                   curve_gen_point: ECPoint=None, sha_type="256"):
+                   curve_gen_point: ECPoint=None, sha_type="256",
+                   return_point=False):
     """Algrorithm for generation determenistic random integers with RFC 6979.
 
     RFC 6979 - Deterministic Usage DSA and ECDSA.
@@ -96,7 +344,11 @@ def random_rfc6979(message: bytes, x: int, q: int,
         x -- private key for ECDSA,
         q -- the order of the elliptic curve,
         curve_gen_point -- generator point for the elliptic curve,
-        sha_type -- type of hashing.
+        sha_type -- type of hashing,
+        return_point -- return a couple (k, curve_gen_point * k), the point
+                        is computed to check k (None if no generator point).
+    The steps b-h are HMAC-DRBG (HmacDrbg) seeded with the private key
+    and the hash of the message, every candidate is the next output.
     """
 
     def bits2int(b: bytes):
@@ -123,17 +375,7 @@ def random_rfc6979(message: bytes, x: int, q: int,
         """Convert a sequence of bits to a sequence of rlen bits"""
         z1 = bits2int(b)
         z2 = z1 % q
-        bits = int2octets(z2)
-        result = (rlen // 8 - len(bits)) * b"\x00" + bits
-        return result
-
-    def test_suitable(k):
-        """Check if k is suitable for ECDSA"""
-        if curve_gen_point is None:
-            return True
-        else:
-            C = curve_gen_point * k
-            return C.x != 0
+        return int2octets(z2)
 
     # Preparation
     qlen = q.bit_length()
@@ -141,40 +383,23 @@ def random_rfc6979(message: bytes, x: int, q: int,
 
     # step a
     h1 = sha(message, sha_type)
-    hlen = len(h1)
-
-    # step b
-    v = b"\x01" * hlen
-
-    # step c
-    k = b"\x00" * hlen
-
-    # step d
-    k = hmac_sha(k, v + b"\x00" + int2octets(x) + bits2octets(h1), sha_type)
-
-    # step e
-    v = hmac_sha(k, v, sha_type)
-
-    # step f
-    k = hmac_sha(k, v + b"\x01" + int2octets(x) + bits2octets(h1), sha_type)
 
-    # step g
-    v = hmac_sha(k, v, sha_type)
+    # steps b-g: K = 00..00, V = 01..01 and the update with the seed
+    drbg = HmacDrbg(int2octets(x), bits2octets(h1), sha_type=sha_type,
+                    reseed_interval=None)
 
-    # step h
+    # step h: the candidates are the next outputs of HMAC-DRBG
+    # (K and V are updated after each one)
     while True:
-        t = bytes()
-        while len(t) * 8 < qlen:
-            v = hmac_sha(k, v, sha_type)
-            t += v
-
-        kk = bits2int(t)
+        kk = bits2int(drbg.generate(rlen // 8))
         # Check kk
-        if 1 <= kk < q and test_suitable(kk):
-            break
-        else:
-            k = hmac_sha(k, v + b"\x00", sha_type)
-            v = hmac_sha(k, v, sha_type)
-
-    return kk
+        if 1 <= kk < q:
+            if curve_gen_point is None:
+                point = None
+                break
+            # Check if kk is suitable for ECDSA
+            point = curve_gen_point * kk
+            if point.x != 0:
+                break
 
+    return (kk, point) if return_point else kk
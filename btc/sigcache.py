@@ -0,0 +1,95 @@
+import os
+import threading
+from collections import OrderedDict
+
+from btc.utils import sha256, int2bytes
+
+
+# Approximate memory (bytes) for one entry: a 32-byte key in OrderedDict
+SIGCACHE_ENTRY_SIZE = 176
+# Default memory limit of the cache (bytes)
+SIGCACHE_MAX_BYTES = 32 * 2 ** 20
+
+
+class SignatureCache:
+    """Represents a cache of the valid signatures (hash, r, s, public key).
+
+    The entries are salted hashes of the signatures, so the cache
+    keeps 32 bytes per signature and the keys cannot be predicted.
+    Only valid signatures are cached, the least recently used entries
+    are evicted above the memory limit. The entries are changed under
+    a lock, so the cache may be shared by threads.
+    """
+
+    def __init__(self, max_bytes=SIGCACHE_MAX_BYTES, salt: bytes = None):
+        """Construct an object.
+
+        Parameters:
+            max_bytes -- the memory limit of the cache (bytes),
+            salt -- a salt for the hashes (None - random 32 bytes).
+        """
+        self.max_entries = max(1, max_bytes // SIGCACHE_ENTRY_SIZE)
+        self.salt = os.urandom(32) if salt is None else salt
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def __repr__(self):
+        return \
+            str({
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            })
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def get_key(self, hash: bytes, r: bytes, s: bytes, public_key: bytes):
+        """Return the salted hash of a signature"""
+        # Each part has its length to avoid ambiguous concatenations
+        data = self.salt
+        for part in (hash, r, s, public_key):
+            data += int2bytes(len(part), 1) + part
+
+        return sha256(data)
+
+
+    def contains(self, hash: bytes, r: bytes, s: bytes, public_key: bytes):
+        """Return True if the signature is in the cache"""
+        key = self.get_key(hash, r, s, public_key)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+
+            self.misses += 1
+            return False
+
+
+    def add(self, hash: bytes, r: bytes, s: bytes, public_key: bytes):
+        """Add a valid signature to the cache"""
+        key = self.get_key(hash, r, s, public_key)
+        with self._lock:
+            self._entries[key] = None
+            self._entries.move_to_end(key)
+
+            # Evict the least recently used entries
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+    def clear(self):
+        """Remove all the entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
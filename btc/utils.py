@@ -3,38 +3,22 @@ from random import randrange
 import hashlib
 import hmac
 
-
-BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
-BASE58_COUNT = len(BASE58_ALPHABET)
+from btc import der as der_codec
+from btc.base58 import BASE58_ALPHABET, BASE58_COUNT, encode_int, \
+    decode_int
 
 
 def base58_encode(b: bytes):
-    """Encode a bytes-string to a base58-encoded string"""
-    num = bytes2int(b)
-
-    encoded = ""
-    while num >= BASE58_COUNT:
-        mod = num % BASE58_COUNT
-        encoded = BASE58_ALPHABET[mod] + encoded
-        num = num // BASE58_COUNT
+    """Encode a bytes-string to a base58-encoded string.
 
-    if num:
-        encoded = BASE58_ALPHABET[num] + encoded
-
-    return encoded
+    Leading zero bytes are not encoded (see btc.base58.encode).
+    """
+    return encode_int(bytes2int(b))
 
 
 def base58_decode(s: str, length=None):
     """Decode a base58-encoded string to a bytes-string"""
-    decoded = 0
-    multi = 1
-    s = s[::-1]
-
-    for char in s:
-        decoded += multi * BASE58_ALPHABET.index(char)
-        multi = multi * BASE58_COUNT
-
-    return int2bytes(decoded, length)
+    return int2bytes(decode_int(s), length)
 
 
 def sha(data: bytes, type="256"):
@@ -73,6 +57,57 @@ def hmac_sha(secret: bytes, data: bytes, type="256"):
     return hash.digest()
 
 
+# Hash constructors and block sizes (bytes) for HMAC
+_HMAC_HASHES = {
+    "1": (hashlib.sha1, 64),
+    "224": (hashlib.sha224, 64),
+    "256": (hashlib.sha256, 64),
+    "384": (hashlib.sha384, 128),
+    "512": (hashlib.sha512, 128)
+}
+# Translation tables: byte -> byte ^ ipad, byte -> byte ^ opad
+_IPAD = bytes(i ^ 0x36 for i in range(256))
+_OPAD = bytes(i ^ 0x5c for i in range(256))
+
+
+class HmacSha:
+    """Represents a keyed HMAC-SHA context for one secret.
+
+    The inner (key ^ ipad) and outer (key ^ opad) hash states are
+    computed once, every digest copies them, so many messages with
+    the same secret (ex. the children of one BIP32 key) skip the setup.
+    """
+
+    def __init__(self, secret: bytes, type="256"):
+        """Construct an object.
+
+        Parameters:
+            secret -- the key of HMAC,
+            type -- the hash ("1", "224", "256", "384" or "512").
+        """
+        try:
+            hash_new, block_size = _HMAC_HASHES[type]
+        except KeyError:
+            raise ValueError("Invalid type for HMAC_SHA") from None
+
+        if len(secret) > block_size:
+            secret = hash_new(secret).digest()
+        secret = secret.ljust(block_size, b"\x00")
+
+        self.type = type
+        self._inner = hash_new(secret.translate(_IPAD))
+        self._outer = hash_new(secret.translate(_OPAD))
+
+
+    def digest(self, data: bytes):
+        """Return the HMAC bytes for data"""
+        inner = self._inner.copy()
+        inner.update(data)
+        outer = self._outer.copy()
+        outer.update(inner.digest())
+        return outer.digest()
+
+
 def sha256(data):
     """Return the hash-sha256 (bytes/str) for data (bytes/str)"""
     if isinstance(data, str):
@@ -112,6 +147,28 @@ def mod_inverse(a, m):
     return x % m
 
 
+def batch_mod_inverse(values, m):
+    """Return a list with a^-1 mod m for each a in values.
+
+    Montgomery's trick: one modular inverse for all the values
+    and three multiplications per value.
+    """
+    # prefix[i] = values[0] * ... * values[i-1] mod m
+    prefix = []
+    acc = 1
+    for a in values:
+        prefix.append(acc)
+        acc = acc * a % m
+
+    inv = mod_inverse(acc, m)
+    result = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        result[i] = inv * prefix[i] % m
+        inv = inv * values[i] % m
+
+    return result
+
+
 def int2bytes(i: int, length=32):
     """Convert an integer to bytes of length"""
     if length is None:
@@ -149,34 +206,28 @@ def signature_to_der(left: bytes, right: bytes):
     """Convert two integers (in sequences of bits) to
     Distinguished Encoding Rules (DER)
     """
-
     # Add a leading zero if the first bit is 1 (it must be a positive integer)
-    r = b"\x00" + left if left[0] > 127 else left
-    s = b"\x00" + right if right[0] > 127 else right
-
-    # Add the prefix of an integer
-    rs = b"\x02" + int2bytes(len(r), 1) + r + \
-         b"\x02" + int2bytes(len(s), 1) + s
-
-    # Add the prefix of sequence
-    result = b"\x30" + int2bytes(len(rs), 1) + rs
-    return result
+    r = left.lstrip(b"\x00")
+    s = right.lstrip(b"\x00")
+    if not r or not s:
+        raise ValueError("The integers of a signature must be positive")
+    r = b"\x00" + r if r[0] > 127 else r
+    s = b"\x00" + s if s[0] > 127 else s
+
+    # The prefixes of the sequence and the integers
+    return b"".join((
+        bytes((der_codec.DER_SEQUENCE, len(r) + len(s) + 4,
+               der_codec.DER_INTEGER, len(r))),
+        r,
+        bytes((der_codec.DER_INTEGER, len(s))),
+        s
+    ))
 
 
 def der_to_signature(der: bytes):
     """Convert a DER (two integers) to a list with two integers (in sequences of bits)"""
-    #rs_len = der[1]
-    r_len = der[3]
-    s_len = der[5+r_len]
-
-    r = der[4 : 4+r_len]
-    # Del leading zero
-    r = r[1:] if r[0] == 0 and r[1] > 127 else r
-
-    s = der[6+r_len : 6+r_len+s_len]
-    # Del leading zero
-    s = s[1:] if s[0] == 0 and s[1] > 127 else s
-    return r, s
+    r_start, r_end, s_start, end = der_codec.find_signature(der)
+    return der[r_start : r_end], der[s_start : end]
 
 
 def ipv42bytes(ipv4: str):
@@ -0,0 +1,220 @@
+import multiprocessing
+import queue
+import time
+from secrets import randbelow
+
+from btc.utils import sha256, ripemd160, int2bytes, bytes2int
+from btc.base58 import BASE58_ALPHABET, BASE58_COUNT
+from btc.ecpoint import ECPoint
+from btc.keys import KeysBTC
+
+
+# The length of an address payload: version + HASH160 + checksum
+ADDRESS_PAYLOAD_LEN = 25
+# The number of keys checked by a worker between reports
+VANITY_BATCH_SIZE = 4096
+
+
+class VanitySearch:
+    """Represents a search of a btc-address with a prefix (vanity address).
+
+    Workers (processes) walk incremental ranges of private keys from
+    random starts and compare HASH160 of the public keys with the
+    ranges of payloads which give the prefix, without base58 encoding.
+    """
+
+    def __init__(self, prefix: str, version: int = None, compressed=True,
+                 processes: int = None, batch_size=VANITY_BATCH_SIZE):
+        """Construct an object.
+
+        Parameters:
+            prefix -- a prefix of the address (ex. "1Abc"),
+            version -- the address version (None - mainnet),
+            compressed -- use compressed public keys,
+            processes -- the number of workers (None - the number of CPUs),
+            batch_size -- the number of keys between progress reports.
+        """
+        self.prefix = prefix
+        self.version = KeysBTC.get_addr_ver_main() \
+            if version is None else version
+        self.compressed = compressed
+        self.processes = processes or multiprocessing.cpu_count()
+        self.batch_size = batch_size
+        self.ranges = self.prefix_to_ranges(prefix, self.version)
+
+        if not self.ranges:
+            raise ValueError(
+                "No address with version {:d} has the prefix {:s}".format(
+                    self.version, prefix)
+            )
+
+
+    def __repr__(self):
+        return \
+            str({
+                "prefix": self.prefix,
+                "version": self.version,
+                "compressed": self.compressed,
+                "processes": self.processes
+            })
+
+
+    @staticmethod
+    def prefix_to_ranges(prefix: str, version: int):
+        """Return a list of ranges [lo, hi] of (version + HASH160) as
+        integers for the addresses with the prefix.
+
+        The address is "1" * (leading zero bytes) + base58(payload),
+        so the prefix fixes the number of leading zero bytes and the
+        leading base58 digits of the payload, that is a few intervals
+        of the payload (one interval for each length of base58).
+        The checksum (4 lowest bytes) may only change the result on
+        the bounds of the intervals.
+        """
+        for char in prefix:
+            if char not in BASE58_ALPHABET:
+                raise ValueError(
+                    "Invalid character in the prefix: {:s}".format(char)
+                )
+
+        # z leading "1" are z leading zero bytes in the payload
+        rest = prefix.lstrip("1")
+        zeros = len(prefix) - len(rest)
+        if zeros > ADDRESS_PAYLOAD_LEN:
+            return []
+        # Exactly z leading zero bytes if the prefix has other digits
+        payload_min = 256 ** (ADDRESS_PAYLOAD_LEN - 1 - zeros) if rest else 0
+        payload_max = 256 ** (ADDRESS_PAYLOAD_LEN - zeros)
+        # The first byte of the payload is the version
+        payload_min = max(payload_min, version << 192)
+        payload_max = min(payload_max, (version + 1) << 192)
+
+        intervals = []
+        if rest:
+            value = 0
+            for char in rest:
+                value = value * BASE58_COUNT + BASE58_ALPHABET.index(char)
+            # base58(payload) has length digits and starts with rest
+            for length in range(len(rest), 2 * ADDRESS_PAYLOAD_LEN):
+                scale = BASE58_COUNT ** (length - len(rest))
+                intervals.append((value * scale, (value + 1) * scale))
+        else:
+            intervals.append((payload_min, payload_max))
+
+        ranges = []
+        for lo, hi in intervals:
+            lo, hi = max(lo, payload_min), min(hi, payload_max)
+            if lo < hi:
+                # Remove the checksum (4 bytes)
+                ranges.append((lo >> 32, (hi - 1) >> 32))
+
+        return ranges
+
+
+    def run(self, timeout=None, progress=None, progress_interval=1.0):
+        """Search an address with the prefix.
+
+        Parameters:
+            timeout -- the maximum time of the search (seconds),
+            progress -- a function progress(keys, keys_per_second)
+                        called every progress_interval seconds.
+        Return -- a KeysBTC object with the address or None if
+                  the time is out.
+        """
+        context = multiprocessing.get_context()
+        stop = context.Event()
+        found = context.Queue()
+        counter = context.Value("Q", 0)
+
+        workers = [
+            context.Process(
+                target=_search_worker,
+                args=(self.ranges, self.prefix, self.version,
+                      self.compressed, self.batch_size, found, stop, counter),
+                daemon=True
+            )
+            for _ in range(self.processes)
+        ]
+
+        started = time.monotonic()
+        private_key = None
+        try:
+            for worker in workers:
+                worker.start()
+
+            while timeout is None or time.monotonic() - started < timeout:
+                try:
+                    private_key = found.get(timeout=progress_interval)
+                    break
+                except queue.Empty:
+                    pass
+                if progress is not None:
+                    elapsed = time.monotonic() - started
+                    progress(counter.value, counter.value / elapsed)
+        finally:
+            # Stop the workers
+            stop.set()
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+            found.close()
+
+        if private_key is None:
+            return None
+
+        keys = KeysBTC(private_key)
+        # Cache the public key in the right format for the address
+        keys.get_public_key(self.compressed)
+        keys.get_address(self.version)
+
+        return keys
+
+
+    @staticmethod
+    def search(ranges, prefix: str, version: int, compressed, start: int,
+               count: int = None, batch_size=VANITY_BATCH_SIZE):
+        """Return a generator of couples (private_key, checked) for
+        private keys from start, where checked is the number of the keys
+        checked since the previous couple; private_key is None if
+        batch_size keys are checked and no address is found.
+        """
+        N = ECPoint.get_secp256k1_order()
+        version_int = version << 160
+        checked = 0
+        for k, point in ECPoint.iter_multiples(
+                KeysBTC.get_generator_point(), start, 1, count, batch_size):
+            checked += 1
+            if not point.is_infinity():
+                pubkey_hash = ripemd160(sha256(
+                    KeysBTC.point_to_publickey(point, compressed)))
+                value = version_int | bytes2int(pubkey_hash)
+                for lo, hi in ranges:
+                    if lo <= value <= hi:
+                        # Check the address (the checksum on the bounds)
+                        address = KeysBTC.pubkey_hash_to_address(pubkey_hash,
+                                                                 version)
+                        if address.startswith(prefix):
+                            yield int2bytes(k % N), checked
+                            checked = 0
+                        break
+            if checked >= batch_size:
+                yield None, checked
+                checked = 0
+        if checked:
+            yield None, checked
+
+
+def _search_worker(ranges, prefix, version, compressed, batch_size,
+                   found, stop, counter):
+    """Walk the private keys from a random start until stop is set"""
+    start = 1 + randbelow(ECPoint.get_secp256k1_order() - 1)
+    for private_key, checked in VanitySearch.search(
+            ranges, prefix, version, compressed, start, None, batch_size):
+        with counter.get_lock():
+            counter.value += checked
+        if private_key is not None:
+            found.put(private_key)
+            break
+        if stop.is_set():
+            break
@@ -0,0 +1,62 @@
+# --- Usage and testing addrindex.py ---
+if __name__ == "__main__":
+
+    import os
+    import tempfile
+    from btc.bip32 import ExtendedKey, BIP32
+    from btc.addrindex import AddressIndex
+
+    root_prv = ExtendedKey.seed_to_master_key(bytes(range(64)))
+    bip32 = BIP32(root_prv)
+
+    # The public keys of the accounts m/44'/0'/<account>'
+    accounts = []
+    for account in range(0, 2):
+        prv = bip32.derive_node([BIP32.hardened_index(44),
+                                 BIP32.hardened_index(0),
+                                 BIP32.hardened_index(account)])["private"]
+        accounts.append(ExtendedKey(prv.get_public_point(), prv.chain_code,
+                                    prv.level, prv.index, prv.fingerprint))
+
+    index = AddressIndex(gap_limit=20)
+    for account, account_pub in enumerate(accounts):
+        index.add_account(account, account_pub)
+    print(index)
+
+    # Lookup by an address and by HASH160
+    change = BIP32.pub_to_child(accounts[1], 1)
+    address = list(BIP32.iter_addresses(change, 7, 1))[0]
+    print(address[3], index.lookup(address[3]))
+    print("Lookup: ", "OK" if index.lookup(address[3]) == (1, 1, 7) and
+                      index.lookup(address[2]) == (1, 1, 7) and
+                      index.get_address(1, 1, 7) == address[3]
+                      else "FALSE")
+    print("Unknown: ", "OK" if index.lookup("1BoatSLRHtKNngkdXEeobR76b53LETtpyT")
+                       is None else "FALSE")
+    # The same HASH160 with another version (testnet, P2SH)
+    from btc.base58 import encode_check
+    others = [encode_check(bytes((version,)) + address[2])
+              for version in (0x6f, 0x05)]
+    print("Other version: ",
+          "OK" if all(index.lookup(a) is None and a not in index and
+                      index.mark_used(a) is None for a in others)
+          else "FALSE")
+
+    # The gap limit advances after a used address
+    far = list(BIP32.iter_addresses(change, 30, 1))[0]
+    print("Not derived: ", "OK" if far[3] not in index else "FALSE")
+    index.mark_used(index.get_address(1, 1, 15))
+    print(index)
+    print("Extended: ", "OK" if index.lookup(far[3]) == (1, 1, 30) else "FALSE")
+
+    # Save and load (without the derivation)
+    file_name = os.path.join(tempfile.mkdtemp(), "index.bin")
+    index.save(file_name)
+    print("File size: ", os.path.getsize(file_name))
+    loaded = AddressIndex.load(file_name)
+    print("Load: ", "OK" if loaded.lookup(far[3]) == (1, 1, 30) and
+                    len(loaded) == len(index) else "FALSE")
+    loaded.mark_used(far[3])
+    print("Extended after load: ",
+          "OK" if len(loaded) == len(index) + 15 else "FALSE")
+    os.remove(file_name)
@@ -0,0 +1,51 @@
+# --- Usage and testing base58.py ---
+if __name__ == "__main__":
+
+    import os
+    from btc import base58
+    from btc.utils import sha256
+
+    # Leading zero bytes are encoded to "1"
+    print(base58.encode(b"\x00\x00\x01"))
+    print("Leading zeros: ", "OK" if base58.encode(b"\x00\x00\x01") == "112"
+                          else "FALSE")
+    print("Empty: ", "OK" if base58.encode(b"") == ""
+                     and base58.decode("") == b"" else "FALSE")
+
+    # Base58Check: the address of the public key hash
+    payload = bytes.fromhex("00010966776006953d5567439e5e39f86a0d273bee")
+    address = base58.encode_check(payload)
+    print(address)
+    print("Address: ", "OK"
+          if address == "16UwLL9Risc3QfPqBUvKofHmBQ7wMtjvM" else "FALSE")
+    print("Decode check: ", "OK" if base58.decode_check(address) == payload
+                            else "FALSE")
+    try:
+        base58.decode_check(address[:-1] + "N")
+        print("Wrong checksum: FALSE")
+    except ValueError as e:
+        print("Wrong checksum: OK ({:s})".format(str(e)))
+
+    # The slow reference encoding
+    def encode_reference(data):
+        num = int.from_bytes(data, "big")
+        s = ""
+        while num:
+            num, d = divmod(num, 58)
+            s = base58.BASE58_ALPHABET[d] + s
+        return "1" * (len(data) - len(data.lstrip(b"\x00"))) + s
+
+    # Random data with leading zeros, many payloads at once
+    payloads = [b"\x00" * (i % 3) + os.urandom(i) for i in range(100)]
+    encoded = base58.encode_many(payloads)
+    print("Encode many: ", "OK"
+          if encoded == [encode_reference(p) for p in payloads] else "FALSE")
+    print("Decode many: ", "OK"
+          if base58.decode_many(encoded) == payloads else "FALSE")
+    encoded = base58.encode_many(payloads, check=True)
+    print("Decode many check: ", "OK"
+          if base58.decode_many(encoded, check=True) == payloads
+          else "FALSE")
+    print("Checksum: ", "OK"
+          if base58.decode(encoded[5])[-4:] == sha256(sha256(payloads[5]))[:4]
+          else "FALSE")
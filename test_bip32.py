@@ -73,3 +73,123 @@ if __name__ == "__main__":
     child_public = BIP32.pub_to_child(k, 0)     # m/0
     print(child_public.serialize())
 
+
+    # The batch derivation gives the same child public keys
+    children = BIP32.pub_to_children(k, range(0, 20))
+    print("Batch child public keys: ",
+          "OK" if [c.serialize() for c in children] ==
+                  [BIP32.pub_to_child(k, i).serialize() for i in range(0, 20)]
+          else "FALSE")
+
+    # The keyed HMAC context gives the same hashes as HMAC-SHA512
+    from btc.utils import HmacSha, hmac_sha512, int2bytes
+    context = HmacSha(k.chain_code, "512")
+    print("HMAC context: ",
+          "OK" if all(context.digest(int2bytes(i, 4)) ==
+                      hmac_sha512(k.chain_code, int2bytes(i, 4))
+                      for i in range(0, 100))
+          else "FALSE")
+
+    # The derivation cache: repeated requests derive only the last level
+    print(bip32_1.cache)
+    bip32_3 = BIP32(root_prv, bip32_1.level_indexes, cache_capacity=0)
+    print("Derivation cache: ",
+          "OK" if [c.serialize() for c in bip32_1.ckd_priv(range(0, 5))] ==
+                  [c.serialize() for c in bip32_3.ckd_priv(range(0, 5))] and
+                  len(bip32_3.cache) == 0
+          else "FALSE")
+    # A private and a public key for the path m/1/2/3
+    bip32_4 = BIP32(root_prv)
+    node = bip32_4.derive_node([1, 2, 3])
+    print("Cached node: ",
+          "OK" if node["private"].serialize() ==
+                      bip32_4.derive_node([1, 2, 3])["private"].serialize()
+                  and bip32_4.cache.hits == 1
+                  and node["private"].get_public_point() ==
+                      node["public"].key
+          else "FALSE")
+
+    # Lazy range derivation: the children and the addresses
+    from itertools import islice
+    from btc.utils import sha256, ripemd160
+    children = bip32_2.ckd_pub_range()
+    print("Range derivation: ",
+          "OK" if [c.serialize() for c in islice(children, 30)] ==
+                  [c.serialize() for c in bip32_2.ckd_pub(range(0, 30))]
+          else "FALSE")
+    # Continue the same generator (the range is extended)
+    print("Range continued: ",
+          "OK" if next(children).index == 30 else "FALSE")
+
+    parent = bip32_2.keys_path[-1]["public"]
+    addresses = list(BIP32.iter_addresses(parent, 0, 10))
+    print(addresses[0][3])
+    print("Addresses: ",
+          "OK" if [a[3] for a in addresses] ==
+                  [KeysBTC.pubkey_hash_to_address(ripemd160(sha256(
+                      KeysBTC.point_to_publickey(c.key))))
+                   for c in bip32_2.ckd_pub(range(0, 10))]
+          else "FALSE")
+
+    # Gap-limit scan: the used addresses are 3, 10 and 40 (gap 20)
+    used = {a[3] for a in BIP32.iter_addresses(parent, 0, 100)
+            if a[0] in (3, 10, 40)}
+    found = [a[0] for a in BIP32.scan_addresses(parent, used.__contains__)]
+    print("Gap scan: ", "OK" if found == [3, 10] else "FALSE")
+    bad_sizes = 0
+    for scan in (BIP32.scan_addresses(parent, used.__contains__, 0),
+                 BIP32.iter_pub_children(parent, 0, None, 0),
+                 BIP32.iter_pub_children(parent, -1, 10),
+                 BIP32.iter_pub_children(parent, 2 ** 31 - 5, 10)):
+        try:
+            next(scan)
+        except ValueError:
+            bad_sizes += 1
+    print("Gap scan sizes: ", "OK" if bad_sizes == 4 else "FALSE")
+
+    # Path expressions: the paths as strings, ranges and wildcards
+    from btc.bip32 import DerivationPath
+    print("Path string: ",
+          "OK" if BIP32(root_prv, "m/44'/0'/0'").level_indexes ==
+                  bip32_1.level_indexes else "FALSE")
+    path = DerivationPath("m/84h/0h/{0-9}'/0/0-999")
+    print(path, len(path), path.count())
+    leaves = bip32_4.iter_path("m/44'/0'/{0,2}'/{0-1}/*")
+    first = [next(leaves) for _ in range(0, 3)]
+    print([indexes[-3:] for indexes, node in first])
+    print("Path leaves: ",
+          "OK" if all(node["private"].serialize() ==
+                      bip32_1.derive_node(list(indexes))["private"].serialize()
+                      for indexes, node in first)
+          else "FALSE")
+    # The expanded paths of a wildcard are generated lazily
+    indexes = DerivationPath("m/0/*/{2,0-1}").iter_indexes()
+    print("Lazy expansion: ",
+          "OK" if [next(indexes) for _ in range(0, 4)] ==
+                  [(0, 0, 2), (0, 0, 0), (0, 0, 1), (0, 1, 2)]
+          else "FALSE")
+    # The repeated indexes of a list are taken once
+    path = DerivationPath("m/{1,1}/{0-5,3-7}")
+    leaves = [indexes for indexes, node in bip32_4.iter_path(path)]
+    print("Path duplicates: ",
+          "OK" if path.count() == 8 and
+                  leaves == [(1, i) for i in range(0, 8)]
+          else "FALSE")
+    try:
+        DerivationPath("m/44'/x")
+        print("Invalid path: FALSE")
+    except ValueError as err:
+        print("Invalid path: OK ({:s})".format(str(err)))
+
+    # A changed node does not change the cache
+    node = bip32_4.derive_node([1, 2])
+    node["private"].chain_code = bytes(32)
+    node["public"].deserialize(root_prv.serialize())
+    node["private"] = "changed"
+    uncached = BIP32(root_prv, cache_capacity=0)
+    print("Cache copy: ",
+          "OK" if all(bip32_4.derive_node(path)[name].serialize() ==
+                      uncached.derive_node(path)[name].serialize()
+                      for path in ([1, 2], [1, 2, 0])
+                      for name in ("private", "public"))
+          else "FALSE")
@@ -0,0 +1,62 @@
+# --- Usage and testing der.py ---
+if __name__ == "__main__":
+
+    from btc import der
+    from btc.keys import KeysBTC
+    from btc.utils import signature_to_der, der_to_signature, int2bytes
+
+    keys = KeysBTC()
+    signatures = [tuple(int.from_bytes(i, "big")
+                        for i in keys.sign(int2bytes(i)))
+                  for i in range(1, 51)]
+
+    # Encoding and decoding
+    encoded = [der.encode_signature(r, s) for r, s in signatures]
+    print(encoded[0].hex())
+    print("Decode: ", "OK" if [der.decode_signature(d) for d in encoded] ==
+                      signatures else "FALSE")
+
+    # The bytes interface (utils)
+    r, s = signatures[0]
+    print("Bytes interface: ", "OK"
+          if der_to_signature(signature_to_der(int2bytes(r), int2bytes(s))) ==
+             (int2bytes(r).lstrip(b"\x00"), int2bytes(s).lstrip(b"\x00"))
+          else "FALSE")
+    try:
+        signature_to_der(b"\x00" * 32, int2bytes(s))
+        print("Zero integer:  FALSE")
+    except ValueError:
+        print("Zero integer:  OK")
+
+    # The leading zero of an integer with the highest bit set
+    sig = der.encode_signature(0x80, 1)
+    print(sig.hex())
+    print("Leading zero: ", "OK" if sig.hex() == "3007020200800201" + "01"
+                            and der.decode_signature(sig) == (0x80, 1)
+                            else "FALSE")
+
+    # Many signatures in one buffer (+ a hash type after a signature)
+    buffer = b"".join(encoded)
+    print("Bulk: ", "OK" if der.decode_signatures(buffer) == signatures
+                    else "FALSE")
+    r, s, end = der.parse_signature(encoded[0] + b"\x01")
+    print("Hash type after: ", "OK" if end == len(encoded[0]) else "FALSE")
+
+    # Malformed signatures
+    malformed = [
+        b"",
+        b"\x31" + encoded[0][1:],                 # not a sequence
+        encoded[0][:-1],                          # too short
+        encoded[0][:1] + b"\x50" + encoded[0][2:],  # wrong total length
+        bytes.fromhex("30080203000001020101"),    # not minimal R
+        bytes.fromhex("3006020181020101"),        # negative R
+        bytes.fromhex("3006020101020001"),        # empty S
+        encoded[0] + b"\x00"                      # extra bytes
+    ]
+    errors = 0
+    for sig in malformed:
+        try:
+            der.decode_signature(sig)
+        except ValueError:
+            errors += 1
+    print("Malformed: ", "OK" if errors == len(malformed) else "FALSE")
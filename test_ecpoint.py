@@ -16,3 +16,61 @@ if __name__ == "__main__":
             continue
 
     print(p)
+
+    # Check the scalar multiplication with the affine addition
+    g = ECPoint(ECPoint.get_secp256k1_gx(), ECPoint.get_secp256k1_gy())
+    s = ECPoint.infinity()
+    ok = True
+    for k in range(1, 50):
+        s = g if k == 1 else s + g
+        ok = ok and (g * k == s)
+    ok = ok and (g * ECPoint.get_secp256k1_order() == ECPoint.infinity())
+    ok = ok and (g * (ECPoint.get_secp256k1_order() - 1) + g ==
+                 ECPoint.infinity())
+    print("Scalar multiplication: ", "OK" if ok else "FALSE")
+
+    # Check the fixed-base table with the generic multiplication
+    from btc.ecpoint import FixedBaseTable
+    table = FixedBaseTable(p, ECPoint.get_secp256k1_order())
+    ok = all(table.multiply(k) == p * k
+             for k in [1, 2, 7, 2 ** 128 + 3, ECPoint.get_secp256k1_order() - 1])
+    print("Fixed-base table: ", "OK" if ok else "FALSE")
+
+    # Check wNAF (with and without GLV) with the double-and-add
+    from random import randrange
+    ok = True
+    for _ in range(20):
+        k = randrange(-ECPoint.get_secp256k1_order(),
+                      2 * ECPoint.get_secp256k1_order())
+        q = p.multiply_binary(p, k)
+        ok = ok and p.multiply(p, k) == q and p.multiply(p, k, False) == q
+    print("wNAF multiplication: ", "OK" if ok else "FALSE")
+
+    # Check the multi-scalar multiplication with the sum of products
+    g = ECPoint.get_secp256k1_generator()
+    terms = [(g, randrange(ECPoint.get_secp256k1_order())),
+             (p, randrange(ECPoint.get_secp256k1_order())),
+             (p * 3, -randrange(ECPoint.get_secp256k1_order()))]
+    s = g.multiply_binary(g, terms[0][1])
+    for q, k in terms[1:]:
+        s = s + q.multiply_binary(q, k)
+    print("Multi-scalar multiplication: ",
+          "OK" if ECPoint.multi_multiply(terms) == s else "FALSE")
+
+    # Points are immutable and share the curve parameters
+    try:
+        p.x = 1
+        print("Immutable point: FALSE")
+    except AttributeError:
+        print("Immutable point: ",
+              "OK" if (p * 2).curve is g.curve and
+                      ECPoint.infinity() is ECPoint.infinity() else "FALSE")
+
+    # Check the bucket method (Pippenger) with interleaved wNAF (Strauss)
+    terms = [(p * randrange(1, ECPoint.get_secp256k1_order()),
+              randrange(-ECPoint.get_secp256k1_order(),
+                        ECPoint.get_secp256k1_order()))
+             for _ in range(30)]
+    print("Pippenger multiplication: ",
+          "OK" if ECPoint.multi_multiply(terms, method="pippenger") ==
+                  ECPoint.multi_multiply(terms, method="strauss") else "FALSE")
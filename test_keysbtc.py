@@ -28,6 +28,105 @@ if __name__ == "__main__":
     message = sha256(b"sample")
     r, s = k.sign(message)
     print(k.verify(message, r, s))
+    print(k.verify(sha256(b"other"), r, s))
 
 
 
+
+    # Recover the public key from the sign
+    r, s, recovery_id = k.sign(message, recoverable=True)
+    print("Recovered public key: ",
+          "OK" if k.recover_public_key(message, r, s, recovery_id) ==
+                  k.get_public_point() else "FALSE")
+
+    # Batch verification (with the recovery ids of R)
+    from btc.utils import int2bytes
+    signatures = []
+    for i in range(0, 10):
+        keys = KeysBTC(int2bytes(1000 + i))
+        message = sha256(bytes([i]))
+        r, s, recovery_id = keys.sign(message, recoverable=True)
+        signatures.append(
+            (message, r, s, keys.get_public_key(), recovery_id)
+        )
+    # Spoil the signature 3
+    signatures[3] = (sha256(b"other"),) + signatures[3][1:]
+    print("Batch verification: ", KeysBTC.verify_batch(signatures))
+
+    # Sequential keys: private key, public key, HASH160, address
+    for private_key, public_key, pubkey_hash, address in \
+            KeysBTC.key_range(k.get_private_key(), 3):
+        print(private_key.hex(), public_key.hex(), pubkey_hash.hex(), address)
+
+    # Verification with a precomputed table for the public key
+    # (the table is built after 2 uses)
+    from btc.ecpoint import TableCache
+    KeysBTC.verify_tables = TableCache(threshold=2, capacity=4)
+    results = []
+    for i in range(0, 3):
+        message = sha256(bytes([i]))
+        r, s = k.sign(message)
+        results.append(k.verify(message, r, s))
+    print(results, k.verify(sha256(b"other"), r, s), KeysBTC.verify_tables)
+    # The tables shared by threads (without the signature cache)
+    import sys
+    import threading
+    KeysBTC.verify_tables = TableCache(threshold=2, capacity=4)
+    signature_cache, KeysBTC.signature_cache = KeysBTC.signature_cache, None
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    results = []
+    def verify_many():
+        results.extend(k.verify(message, r, s) for _ in range(0, 10))
+    threads = [threading.Thread(target=verify_many) for _ in range(0, 4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.setswitchinterval(switch_interval)
+    KeysBTC.signature_cache = signature_cache
+    print("Tables threads: ",
+          "OK" if results == [True] * 40 and len(KeysBTC.verify_tables) == 1
+          else "FALSE")
+
+    # The cache of the verified signatures
+    KeysBTC.verify_batch(signatures)
+    print("Signature cache: ", KeysBTC.signature_cache)
+    # The cache shared by threads (with evictions)
+    from btc.sigcache import SignatureCache, SIGCACHE_ENTRY_SIZE
+    cache = SignatureCache(max_bytes=100 * SIGCACHE_ENTRY_SIZE)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    errors = []
+    def use_cache(thread):
+        try:
+            for i in range(0, 2000):
+                part = bytes([thread, i % 256, i // 256])
+                cache.add(part, part, part, part)
+                cache.contains(part, part, part, part)
+        except Exception as err:
+            errors.append(err)
+    threads = [threading.Thread(target=use_cache, args=(i,))
+               for i in range(0, 4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.setswitchinterval(switch_interval)
+    print("Signature cache threads: ",
+          "OK" if not errors and len(cache) == 100 and
+                  cache.hits + cache.misses == 8000
+          else "FALSE")
+
+    # Keys from a seeded random source (HMAC-DRBG)
+    from btc.randoms import HmacDrbg
+    source = HmacDrbg(b"seed" * 8)
+    pool = [KeysBTC(random_source=source) for _ in range(3)]
+    source = HmacDrbg(b"seed" * 8)
+    print("Seeded keys: ", "OK" if [p.get_private_key() for p in pool] ==
+          [KeysBTC(random_source=source).get_private_key() for _ in range(3)]
+          else "FALSE")
+    # A random start of sequential keys
+    for private_key, public_key, pubkey_hash, address in \
+            KeysBTC.key_range(count=2, random_source=source):
+        print(address, KeysBTC(private_key).get_address() == address)
@@ -0,0 +1,100 @@
+# --- Usage and testing keystore.py ---
+if __name__ == "__main__":
+
+    import os
+    import tempfile
+    from btc.bip32 import ExtendedKey, BIP32
+    from btc.keystore import KeyStore, KeyStoreWriter
+
+    root_prv = ExtendedKey.seed_to_master_key(bytes(range(64)))
+    parent = BIP32.pub_to_child(BIP32(root_prv).master_pub, 0)    # m/0
+    file_name = os.path.join(tempfile.mkdtemp(), "keys.bin")
+
+    # Append the addresses by batches (index, public key, HASH160, ...)
+    with KeyStoreWriter(file_name) as writer:
+        print(writer)
+        writer.append_batch(BIP32.iter_addresses(parent, 0, 100))
+        writer.append_batch(BIP32.iter_addresses(parent, 100, 50))
+    print("File size: ", os.path.getsize(file_name))
+
+    addresses = list(BIP32.iter_addresses(parent, 0, 150))
+    with KeyStore(file_name) as store:
+        print(store)
+        # Random access (the views of the mapped file)
+        index, public_key, pubkey_hash, chain_code = store[120]
+        print(index, public_key.hex(), pubkey_hash.hex(), chain_code)
+        print("Random access: ",
+              "OK" if (index, bytes(public_key), bytes(pubkey_hash)) ==
+                      addresses[120][:3] else "FALSE")
+        del public_key, pubkey_hash
+        # Iteration
+        print("Iteration: ",
+              "OK" if [(i, bytes(k), bytes(h)) for i, k, h, c in store] ==
+                      [a[:3] for a in addresses] else "FALSE")
+
+    # The records with the chain codes (extended public keys)
+    file_name = os.path.join(os.path.dirname(file_name), "children.bin")
+    children = list(BIP32.iter_pub_children(parent, 0, 10))
+    with KeyStoreWriter(file_name, chain_codes=True) as writer:
+        writer.append_children(children[:5])
+    store = KeyStore(file_name)
+    print(len(store))
+    # The reader sees the next batch after refresh
+    with KeyStoreWriter(file_name, chain_codes=True) as writer:
+        writer.append_children(children[5:])
+    print(store.refresh())
+    print("Chain codes: ",
+          "OK" if [bytes(record[3]) for record in store] ==
+                  [c.chain_code for c in children] else "FALSE")
+    store.close()
+
+    try:
+        KeyStoreWriter(file_name)
+        print("Other format: FALSE")
+    except ValueError as err:
+        print("Other format: OK ({:s})".format(str(err)))
+
+    # refresh while the views of the old records are alive
+    store = KeyStore(file_name)
+    record = store[1]
+    with KeyStoreWriter(file_name, chain_codes=True) as writer:
+        writer.append_children(BIP32.iter_pub_children(parent, 10, 5))
+    print("Refresh with views: ",
+          "OK" if store.refresh() == 15 and
+                  bytes(store[1][1]) == bytes(record[1]) and
+                  store[14][0] == 14 else "FALSE")
+    record = store[2]
+    try:
+        store.close()
+        print("Close with views: FALSE")
+    except BufferError:
+        print("Close with views: ",
+              "OK" if store[14][0] == 14 else "FALSE")
+    del record
+    store.close()
+
+    # A partial record at the end (a crashed writer) is removed
+    with open(file_name, "ab") as f:
+        f.write(b"\xff" * 10)
+    with KeyStoreWriter(file_name, chain_codes=True) as writer:
+        writer.append_children(BIP32.iter_pub_children(parent, 15, 5))
+    with KeyStore(file_name) as store:
+        print("Partial record: ",
+              "OK" if [record[0] for record in store] == list(range(0, 20))
+              else "FALSE")
+
+    # The record size in the header must match the flags
+    import struct
+    from btc.keystore import KEY_STORE_MAGIC, KEY_STORE_VERSION, \
+        KEY_STORE_CHAIN_CODE
+    invalid = 0
+    for flags, record_size in ((0, 0), (KEY_STORE_CHAIN_CODE, 57), (0, 89)):
+        with open(file_name, "wb") as f:
+            f.write(struct.pack("<7sBBxxxI", KEY_STORE_MAGIC,
+                                KEY_STORE_VERSION, flags, record_size))
+            f.write(bytes(2 * 89))
+        try:
+            KeyStore(file_name)
+        except ValueError:
+            invalid += 1
+    print("Record size: ", "OK" if invalid == 3 else "FALSE")
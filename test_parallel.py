@@ -0,0 +1,62 @@
+# --- Usage and testing parallel.py ---
+if __name__ == "__main__":
+
+    from btc.bip32 import ExtendedKey, BIP32
+    from btc.parallel import ParallelDerivation
+
+    root_prv = ExtendedKey.seed_to_master_key(bytes(range(64)))
+    # m/44'/0'/0'/0 (the public key from the private one)
+    account = BIP32(root_prv).derive_node(
+        [BIP32.hardened_index(44), BIP32.hardened_index(0),
+         BIP32.hardened_index(0), 0]
+    )
+    prv = account["private"]
+    account["public"] = ExtendedKey(prv.get_public_point(), prv.chain_code,
+                                    prv.level, prv.index, prv.fingerprint)
+
+    # 2 workers, 100 indexes in a task
+    derivation = ParallelDerivation(processes=2, shard_size=100)
+    print(derivation)
+
+    # Child private keys
+    children = list(derivation.iter_children(account["private"], 0, 250))
+    print("Private children: ",
+          "OK" if [c.serialize() for c in children] ==
+                  [BIP32.prv_to_child(account["private"], i).serialize()
+                   for i in range(0, 250)]
+          else "FALSE")
+
+    # Child public keys
+    children = list(derivation.iter_children(account["public"], 1000, 250))
+    print("Public children: ",
+          "OK" if [c.serialize() for c in children] ==
+                  [c.serialize() for c in
+                   BIP32.iter_pub_children(account["public"], 1000, 250)]
+          else "FALSE")
+    # The hardened indexes from a private key
+    hardened = derivation.iter_children(account["private"],
+                                        BIP32.hardened_index(0), 3)
+    print([c.index for c in hardened])
+
+    # The addresses of many accounts (receive and change chains) in order
+    jobs = [(account["public"], 0, 150),
+            (BIP32.pub_to_child(account["public"], 1), 0, 150)]
+    results = list(derivation.iter_jobs(jobs, addresses=True))
+    print(results[0][1][3])
+    print("Jobs: ",
+          "OK" if [(job, item[0]) for job, item in results] ==
+                  [(job, i) for job in range(0, 2) for i in range(0, 150)]
+                  and [item for job, item in results if job == 1] ==
+                  list(BIP32.iter_addresses(jobs[1][0], 0, 150))
+          else "FALSE")
+
+    # Backpressure: the jobs are read only a few tasks ahead
+    pulled = []
+    def many_jobs():
+        for i in range(0, 1000):
+            pulled.append(i)
+            yield account["public"], i * 100, 100
+    results = derivation.iter_jobs(many_jobs(), addresses=True)
+    next(results)
+    print("Bounded tasks: ", "OK" if len(pulled) <= 5 else "FALSE")
+    results.close()
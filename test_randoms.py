@@ -31,3 +31,77 @@ if __name__ == "__main__":
     x = 0x09A4D6792295A7F730FC3F2B49CBC0F62E862272F
     print(int2hex(random_rfc6979(b"test", x, q, None, "224"), ceil(qlen / 4)))
 
+
+
+    # HMAC-DRBG: a persistent stream of random bytes
+    from btc.randoms import HmacDrbg
+    from btc.utils import sha
+
+    drbg = HmacDrbg()
+    print(drbg.generate(32).hex())
+    print("Random below: ", "OK" if all(0 <= drbg.randbelow(1000) < 1000
+                                        for _ in range(1000)) else "FALSE")
+
+    # The same seed gives the same stream, a reseed changes it
+    a = HmacDrbg(b"seed" * 8)
+    b = HmacDrbg(b"seed" * 8)
+    print("Seeded: ", "OK" if a.generate(100000) == b.generate(100000)
+                      else "FALSE")
+    b.reseed()
+    print("Reseed: ", "OK" if a.generate(32) != b.generate(32) else "FALSE")
+
+    # The threads sharing a generator get different outputs
+    import sys
+    import threading
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    outputs = []
+    def draw():
+        outputs.extend([drbg.generate(32) for _ in range(0, 5000)])
+    threads = [threading.Thread(target=draw) for _ in range(0, 4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.setswitchinterval(switch_interval)
+    print("Threads: ", "OK" if len(set(outputs)) == len(outputs) == 20000
+                       else "FALSE")
+
+    # RFC 6979 is HMAC-DRBG seeded with the private key and the hash
+    # (NIST P-256, SHA-256, k = A6E3C57D...)
+    q = 0xffffffff00000000ffffffffffffffffbce6faada7179e84f3b9cac2fc632551
+    x = 0xC9AFA9D845BA75166B5C215767B1D6934E50C3DB36E89B127B8A622B120F6721
+    h = int.from_bytes(sha(b"sample", "256"), byteorder="big") % q
+    drbg = HmacDrbg(x.to_bytes(32, "big"), h.to_bytes(32, "big"))
+    print("RFC 6979: ", "OK" if int.from_bytes(drbg.generate(32), "big") ==
+                        random_rfc6979(b"sample", x, q, None, "256")
+                        else "FALSE")
+
+
+    # Primes: the sieve of the small primes and deterministic Miller-Rabin
+    from btc.randoms import is_prime, next_prime, random_prime, \
+        random_blum_prime
+    print("Small primes: ", "OK" if [n for n in range(30) if is_prime(n)] ==
+                            [2, 3, 5, 7, 11, 13, 17, 19, 23, 29] else "FALSE")
+    # Carmichael number, strong pseudoprimes to several bases, 2^89 - 1
+    print("Pseudoprimes: ", "OK" if not any(is_prime(n) for n in (
+        561, 3215031751, 3825123056546413051, 318665857834031151167461))
+        and is_prime(2 ** 89 - 1) else "FALSE")
+    print("Next prime: ", "OK" if next_prime(2 ** 64) == 2 ** 64 + 13 and
+                          next_prime(2 ** 64 + 3, None, 4) == 2 ** 64 + 51
+                          else "FALSE")
+    p = random_prime(2 ** 64, 2 ** 128)
+    print("Random prime: ", "OK" if 2 ** 64 <= p < 2 ** 128 and is_prime(p)
+                            else "FALSE")
+    p = random_blum_prime(2 ** 64, 2 ** 128)
+    print("Blum prime: ", "OK" if p % 4 == 3 and is_prime(p) else "FALSE")
+
+
+    # RFC 6979 with the point k * G for the signer (one multiplication)
+    from btc.ecpoint import ECPoint
+    G = ECPoint.get_secp256k1_generator()
+    N = ECPoint.get_secp256k1_order()
+    k, point = random_rfc6979(b"sample", 1, N, G, return_point=True)
+    print("RFC 6979 point: ", "OK" if point == G * k and
+                              k == random_rfc6979(b"sample", 1, N, G)
+                              else "FALSE")
@@ -0,0 +1,20 @@
+# --- Usage and testing vanity.py ---
+if __name__ == "__main__":
+
+    from btc.vanity import VanitySearch
+
+    # Search an address with the prefix 1Ab in 2 processes
+    search = VanitySearch("1Ab", processes=2)
+    keys = search.run(
+        timeout=600,
+        progress=lambda keys, speed:
+            print("Checked keys: {:d}, keys/s: {:.0f}".format(keys, speed))
+    )
+    print(keys)
+    print("Prefix: ", "OK" if keys.get_address().startswith("1Ab")
+                      else "FALSE")
+
+    # Testnet address with an uncompressed public key
+    keys = VanitySearch("mzz", version=0x6f, compressed=False,
+                        processes=2).run(timeout=600)
+    print(keys)